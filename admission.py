@@ -0,0 +1,170 @@
+"""
+Admission control for routes that share a worker's threads.
+
+Routes are grouped into classes (image generation, chat, SMS, everything
+else) and each class gets its own limits:
+
+- an AdmissionGate: at most max_concurrency requests run at once, up to
+  max_queue more wait in arrival order for at most max_wait seconds, and any
+  beyond that are turned away at once;
+- a per-client token bucket, so one client cannot use up the class alone.
+
+A burst of slow image requests therefore fills the image class's slots and
+queue and is then rejected in microseconds with a Retry-After estimate, while
+the rest of the thread pool keeps serving events and status checks.
+"""
+import math
+import threading
+import time
+from collections import deque
+
+from rate_limit import KeyedRateLimiter
+
+CLIENT_RATE = 'client_rate'
+QUEUE_FULL = 'queue_full'
+QUEUE_TIMEOUT = 'queue_timeout'
+
+MAX_RETRY_AFTER = 60
+
+
+class Overloaded(Exception):
+    """Raised when a request is not admitted; reason is CLIENT_RATE, QUEUE_FULL or QUEUE_TIMEOUT."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    """
+    A concurrency limit with a bounded FIFO wait queue.
+
+    A released slot is handed straight to the oldest waiter, so late arrivals
+    cannot overtake the queue.
+    """
+
+    def __init__(self, name, max_concurrency, max_queue=0, max_wait=1.0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.admitted = 0
+        self.rejected = {QUEUE_FULL: 0, QUEUE_TIMEOUT: 0}
+        self.peak_waiting = 0
+        self._active = 0
+        self._waiters = deque()
+        # Smoothed time a request holds its slot, for Retry-After estimates
+        self._hold_seconds = None
+        self._lock = threading.Lock()
+
+    def _retry_after(self):
+        # Roughly how long until everything queued now has been admitted
+        hold = self._hold_seconds if self._hold_seconds is not None else 1.0
+        estimate = hold * (len(self._waiters) + 1) / self.max_concurrency
+        return min(MAX_RETRY_AFTER, max(1, math.ceil(estimate)))
+
+    def acquire(self):
+        """Admit the caller, waiting in the queue if needed; return the seconds spent waiting or raise Overloaded."""
+        with self._lock:
+            if self._active < self.max_concurrency and not self._waiters:
+                self._active += 1
+                self.admitted += 1
+                return 0.0
+            if len(self._waiters) >= self.max_queue:
+                self.rejected[QUEUE_FULL] += 1
+                raise Overloaded(QUEUE_FULL, self._retry_after())
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+            self.peak_waiting = max(self.peak_waiting, len(self._waiters))
+
+        started = time.monotonic()
+        waiter.wait(self.max_wait)
+        with self._lock:
+            # Checked under the lock: release() may have handed over the slot just after the wait timed out
+            if not waiter.is_set():
+                self._waiters.remove(waiter)
+                self.rejected[QUEUE_TIMEOUT] += 1
+                raise Overloaded(QUEUE_TIMEOUT, self._retry_after())
+            self.admitted += 1
+        return time.monotonic() - started
+
+    def release(self, held_seconds=None):
+        with self._lock:
+            if held_seconds is not None:
+                self._hold_seconds = held_seconds if self._hold_seconds is None else (
+                    0.8 * self._hold_seconds + 0.2 * held_seconds)
+            if self._waiters:
+                # The slot passes to the next waiter; the active count stays the same
+                self._waiters.popleft().set()
+            else:
+                self._active -= 1
+
+    @property
+    def active(self):
+        return self._active
+
+    @property
+    def waiting(self):
+        return len(self._waiters)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active": self._active,
+                "waiting": len(self._waiters),
+                "peak_waiting": self.peak_waiting,
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected),
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "max_wait_seconds": self.max_wait,
+                "hold_seconds": round(self._hold_seconds, 3) if self._hold_seconds is not None else None
+            }
+
+
+class Ticket:
+    """An admitted request's slot; release() is safe to call more than once."""
+
+    def __init__(self, gate, waited):
+        self.gate = gate
+        self.waited = waited
+        self._admitted_at = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        if self.gate is not None:
+            self.gate.release(time.monotonic() - self._admitted_at)
+
+
+class RouteClass:
+    """
+    The limits for one class of routes.
+
+    max_concurrency=0 means no gate, client_rate=0 no per-client limit.
+    """
+
+    def __init__(self, name, max_concurrency=0, max_queue=0, max_wait=1.0, client_rate=0, client_burst=None):
+        self.name = name
+        self.gate = AdmissionGate(name, max_concurrency, max_queue, max_wait) if max_concurrency > 0 else None
+        self.clients = KeyedRateLimiter(client_rate, client_burst) if client_rate > 0 else None
+        self.rate_limited = 0
+
+    def admit(self, client):
+        """Return a Ticket for client's request, or raise Overloaded."""
+        if self.clients is not None:
+            wait = self.clients.try_acquire(client)
+            if wait > 0:
+                self.rate_limited += 1
+                raise Overloaded(CLIENT_RATE, min(MAX_RETRY_AFTER, max(1, math.ceil(wait))))
+        waited = self.gate.acquire() if self.gate is not None else 0.0
+        return Ticket(self.gate, waited)
+
+    def stats(self):
+        stats = self.gate.stats() if self.gate is not None else {"active": None, "waiting": None}
+        stats["rate_limited"] = self.rate_limited
+        stats["clients"] = len(self.clients) if self.clients is not None else None
+        return stats
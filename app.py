@@ -1,41 +1,464 @@
-from flask import Flask, jsonify, request, send_from_directory, send_file
+from flask import Flask, Response, abort, g, jsonify, request, send_file
 from flask_cors import CORS
 import os
+import json
+import hashlib
+import logging
+import re
+import time
 from dotenv import load_dotenv
 import requests
 from pathlib import Path
 import uuid
+import tempfile
+import urllib.parse
+import threading
 from io import BytesIO
-from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
+from werkzeug.routing import PathConverter
+from werkzeug.wsgi import ClosingIterator
+from events_store import EventStore, InvalidQuery as InvalidEventQuery, parse_date as parse_event_date
+from image_batch import ZipStream, run_batch
+from image_cache import ImageCache, image_cache_key, normalize_image_params
+from image_warmer import CacheWarmer, PopularImages
+from image_variants import (TRANSCODING_AVAILABLE, InvalidVariantOptions, parse_variant_options, supported_formats,
+                            transcode, variant_extension, variant_key, variant_mimetype)
+from singleflight import SingleFlight
+from admission import CLIENT_RATE, Overloaded, RouteClass
+from chat_backends import HuggingFaceChatBackend, LocalChatBackend
+from chat_cache import TTLCache, normalize_chat_message
+from circuit_breaker import CLOSED, CircuitBreaker
+from intents import context_intents, select_manual_response
+from image_jobs import DONE, ERROR, ImageJobManager, JobQueueFull
+from upstream import UpstreamClient
+from rate_limit import TokenBucket
+from sms_dispatch import normalize_phone, send_bulk
+from sms_campaigns import CampaignRunner, CampaignStore
+from static_files import StaticManifest
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, SIZE_BUCKETS, Registry
+from structured_logging import configure_logging
+from concurrent.futures import ThreadPoolExecutor
 
 # Initialize Flask app
-app = Flask(__name__, static_folder='frontend/dist', static_url_path='')
+# The frontend is served from static_manifest below rather than Flask's static route
+app = Flask(__name__, static_folder=None)
 CORS(app)  # Enable CORS for all routes
 
 # Load environment variables
 load_dotenv()
 
+# JSON logs on stderr, rate-limited per message; per-request detail is DEBUG
+configure_logging(
+    os.getenv("LOG_LEVEL", "INFO"),
+    rate=float(os.getenv("LOG_RATE_PER_SECOND", 1)),
+    burst=int(os.getenv("LOG_BURST", 10))
+)
+logger = logging.getLogger(__name__)
+
 # Get API keys from environment variables
 HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
 
-# Debug: Print API key status (without exposing the actual key)
-if HUGGINGFACE_API_KEY:
-    print(f"✅ HuggingFace API key loaded: {HUGGINGFACE_API_KEY[:8]}...")
-else:
-    print("❌ HuggingFace API key not found in environment variables")
-    print("💡 Please set HUGGINGFACE_API_KEY in your .env file")
+# Upstream endpoints (overridable so they can point at local stub servers)
+HUGGINGFACE_API_URL = os.getenv("HUGGINGFACE_API_URL", "https://api-inference.huggingface.co")
+POLLINATIONS_BASE_URL = os.getenv("POLLINATIONS_BASE_URL", "https://pollinations.ai")
+# Unset means the real API (https://api.twilio.com and friends)
+TWILIO_API_URL = os.getenv("TWILIO_API_URL")
+
+
+def log_startup_status():
+    """Log API key status (without exposing the actual key) once the server starts."""
+    if HUGGINGFACE_API_KEY:
+        logger.info("HuggingFace API key loaded: %s...", HUGGINGFACE_API_KEY[:8])
+    elif chat_backend.name == 'huggingface':
+        logger.warning("HuggingFace API key not found in environment variables; "
+                       "set HUGGINGFACE_API_KEY in your .env file")
+    logger.info("Chat backend: %s (%s)", chat_backend.name, chat_backend.model)
+    limited = [name for name, rc in route_classes.items() if rc.clients is not None]
+    if limited and not ADMISSION_CLIENT_HEADER:
+        logger.warning("Per-client rate limits for %s are keyed by the connecting address; behind a "
+                       "reverse proxy set ADMISSION_CLIENT_HEADER", ", ".join(limited))
+
+
+# Prometheus-style metrics, served at /metrics
+metrics = Registry()
+http_requests = metrics.counter(
+    'http_requests', 'HTTP requests by route and status code', ('method', 'route', 'status'))
+http_request_duration = metrics.histogram(
+    'http_request_duration_seconds', 'Time until response headers are ready, by route', ('method', 'route'))
+upstream_latency = metrics.histogram(
+    'upstream_request_duration_seconds', 'Latency of each upstream API attempt', ('upstream', 'status'))
+local_chat_batch_size = metrics.histogram(
+    'local_chat_batch_size', 'Messages per local model generate() call', buckets=(1, 2, 4, 8, 16, 32))
+chat_time_to_first_token = metrics.histogram(
+    'chat_time_to_first_token_seconds', 'Time from a streaming chat request to its first token, by source', ('source',))
+manual_responses = metrics.counter(
+    'chat_manual_responses', 'Chat replies served by the manual fallback, by reason and intent', ('reason', 'intent'))
+image_response_bytes = metrics.histogram(
+    'image_response_bytes', 'Size of images sent to clients, by cache status', ('cache',), buckets=SIZE_BUCKETS)
+image_transcode_duration = metrics.histogram(
+    'image_transcode_duration_seconds', 'Time to resize and re-encode an image variant', ('format',))
+image_cache_warms = metrics.counter(
+    'image_cache_warms', 'Popular images fetched ahead of demand by the cache warmer', ('result',))
+admission_rejections = metrics.counter(
+    'admission_rejections', 'Requests turned away by admission control, by route class and reason', ('class', 'reason'))
+admission_queue_wait = metrics.histogram(
+    'admission_queue_wait_seconds', 'Time admitted requests waited for a slot, by route class', ('class',))
+
 
-# Initialize Twilio client if credentials are available
+def _observe_twilio_response(response, *args, **kwargs):
+    # requests response hook; elapsed covers sending the request until headers arrive
+    upstream_latency.observe(response.elapsed.total_seconds(), 'twilio', response.status_code)
+
+
+# Twilio client, created on first use if credentials are available
 twilio_client = None
-if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN:
+_twilio_lock = threading.Lock()
+_twilio_initialized = False
+
+
+def _twilio_http_client():
+    from twilio.http.http_client import TwilioHttpClient
+    
+    class RedirectingHttpClient(TwilioHttpClient):
+        # Sends every Twilio API call to TWILIO_API_URL, keeping path and query
+        def request(self, method, url, *args, **kwargs):
+            parts = urllib.parse.urlsplit(url)
+            url = urllib.parse.urlunsplit(urllib.parse.urlsplit(TWILIO_API_URL)[:2] + parts[2:])
+            return super().request(method, url, *args, **kwargs)
+    
+    http_client_class = RedirectingHttpClient if TWILIO_API_URL else TwilioHttpClient
+    return http_client_class(request_hooks={'response': _observe_twilio_response})
+
+
+def get_twilio_client():
+    """Return the Twilio client, building it on first call; None if SMS is not configured."""
+    global twilio_client, _twilio_initialized
+    if twilio_client is None and not _twilio_initialized:
+        with _twilio_lock:
+            if not _twilio_initialized:
+                if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN:
+                    try:
+                        from twilio.rest import Client
+                        twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, http_client=_twilio_http_client())
+                    except Exception as e:
+                        logger.warning("Failed to initialize Twilio client: %s", e)
+                _twilio_initialized = True
+    return twilio_client
+
+# Pooled keep-alive sessions with retry/backoff for each upstream host
+huggingface_client = UpstreamClient(
+    'huggingface',
+    pool_size=int(os.getenv("HUGGINGFACE_POOL_SIZE", 10)),
+    connect_timeout=float(os.getenv("HUGGINGFACE_CONNECT_TIMEOUT", 5)),
+    read_timeout=float(os.getenv("HUGGINGFACE_READ_TIMEOUT", 15)),
+    retries=int(os.getenv("HUGGINGFACE_RETRIES", 1)),
+    latency=upstream_latency
+)
+pollinations_client = UpstreamClient(
+    'pollinations',
+    max_concurrency=int(os.getenv("POLLINATIONS_MAX_CONCURRENCY", 8)),
+    pool_size=int(os.getenv("POLLINATIONS_POOL_SIZE", 20)),
+    connect_timeout=float(os.getenv("POLLINATIONS_CONNECT_TIMEOUT", 10)),
+    read_timeout=float(os.getenv("POLLINATIONS_READ_TIMEOUT", 120)),
+    retries=int(os.getenv("POLLINATIONS_RETRIES", 2)),
+    latency=upstream_latency
+)
+
+# Cache HuggingFace chat completions; identical concurrent prompts share one call
+chat_cache = TTLCache(
+    max_entries=int(os.getenv("CHAT_CACHE_ENTRIES", 1024)),
+    ttl_seconds=float(os.getenv("CHAT_CACHE_TTL_SECONDS", 600))
+)
+chat_flight = SingleFlight()
+
+# Skip HuggingFace entirely while it is failing so fallbacks are instant
+huggingface_breaker = CircuitBreaker(
+    'huggingface',
+    failure_threshold=int(os.getenv("HUGGINGFACE_BREAKER_FAILURES", 5)),
+    reset_timeout=float(os.getenv("HUGGINGFACE_BREAKER_RESET_SECONDS", 30))
+)
+
+# Cache generated images by their generation parameters (memory LRU + disk store)
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "royal-studio-images"))
+image_cache = ImageCache(
+    IMAGE_CACHE_DIR,
+    max_memory_bytes=int(os.getenv("IMAGE_CACHE_MEMORY_MB", 64)) * 1024 * 1024,
+    max_disk_bytes=int(os.getenv("IMAGE_CACHE_DISK_MB", 1024)) * 1024 * 1024
+)
+
+# Concurrent identical image requests share one upstream Pollinations fetch
+image_flight = SingleFlight()
+
+# Background executor for job-based image generation
+image_jobs = ImageJobManager(
+    max_workers=int(os.getenv("IMAGE_JOB_WORKERS", 4)),
+    max_pending=int(os.getenv("IMAGE_JOB_MAX_PENDING", 64))
+)
+IMAGE_JOB_KEEPALIVE_SECONDS = 15
+
+# Batch requests fetch their images in parallel on a shared pool; requests to
+# Pollinations itself are capped by POLLINATIONS_MAX_CONCURRENCY
+IMAGE_BATCH_MAX_ITEMS = int(os.getenv("IMAGE_BATCH_MAX_ITEMS", 16))
+image_batch_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("IMAGE_BATCH_WORKERS", 16)),
+    thread_name_prefix='image-batch'
+)
+
+# Resizing/re-encoding is CPU-bound, so it gets its own pool sized to the CPUs
+image_transcode_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("IMAGE_TRANSCODE_WORKERS", os.cpu_count() or 2)),
+    thread_name_prefix='image-transcode'
+)
+
+# Bulk SMS runs on a bounded pool, paced to the sender number's messages-per-second limit
+SMS_RATE_PER_SECOND = float(os.getenv("SMS_RATE_PER_SECOND", 1))
+sms_rate_limiter = TokenBucket(SMS_RATE_PER_SECOND)
+sms_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SMS_BULK_WORKERS", 8)),
+    thread_name_prefix='sms-bulk'
+)
+
+# Large bulk sends can be queued as durable background campaigns
+SMS_CAMPAIGN_DB = os.getenv("SMS_CAMPAIGN_DB", os.path.join(tempfile.gettempdir(), "royal-studio-sms.sqlite3"))
+sms_campaign_store = CampaignStore(SMS_CAMPAIGN_DB)
+sms_campaign_runner = CampaignRunner(
+    sms_campaign_store,
+    get_twilio_client,
+    TWILIO_PHONE_NUMBER,
+    limiter=sms_rate_limiter,
+    workers=int(os.getenv("SMS_CAMPAIGN_WORKERS", 2))
+)
+
+# Point-in-time gauges read from the components' own counters at scrape time
+metrics.gauge('circuit_breaker_open', '1 while the circuit breaker is not closed', ('name',),
+              lambda: {(huggingface_breaker.name,): int(huggingface_breaker.state != CLOSED)})
+metrics.gauge('image_cache_bytes', 'Bytes held by the image cache', ('tier',),
+              lambda: {(tier,): image_cache.stats()[f"{tier}_bytes"] for tier in ('memory', 'disk')})
+metrics.gauge('image_jobs_pending', 'Image jobs queued or running', (),
+              lambda: {(): image_jobs.stats()["pending"]})
+metrics.gauge('chat_cache_entries', 'Entries in the chat reply cache', (),
+              lambda: {(): chat_cache.stats()["entries"]})
+
+
+# Admission control (per worker process): each route class has its own
+# concurrency limit and bounded wait queue, plus a per-client rate, so a burst
+# of slow image generations cannot take every thread from the other routes.
+# Size the gated classes to leave GUNICORN_THREADS headroom for the rest.
+#
+# Behind a reverse proxy every request comes from the proxy's address; name the
+# header carrying the real client address (e.g. X-Forwarded-For) to limit per client.
+# Clients can put anything in the header, so the address used is the one appended
+# by the outermost of ADMISSION_TRUSTED_PROXIES proxies (counted from the right).
+ADMISSION_CLIENT_HEADER = os.getenv("ADMISSION_CLIENT_HEADER")
+ADMISSION_TRUSTED_PROXIES = max(int(os.getenv("ADMISSION_TRUSTED_PROXIES", 1)), 1)
+
+
+def _route_class(name, concurrency=0, queue=0, wait=1.0, client_rate=0.0, client_burst=None):
+    prefix = f"ADMISSION_{name.upper()}_"
+    client_burst = os.getenv(prefix + "CLIENT_BURST", client_burst)
+    # Without the header every client may share the proxy's address, so the default
+    # per-client rates only apply with it; an explicit rate is keyed by remote address
+    client_rate = client_rate if ADMISSION_CLIENT_HEADER else 0.0
+    return RouteClass(
+        name,
+        max_concurrency=int(os.getenv(prefix + "CONCURRENCY", concurrency)),
+        max_queue=int(os.getenv(prefix + "QUEUE", queue)),
+        max_wait=float(os.getenv(prefix + "QUEUE_WAIT_SECONDS", wait)),
+        client_rate=float(os.getenv(prefix + "CLIENT_RATE", client_rate)),
+        client_burst=float(client_burst) if client_burst is not None else None
+    )
+
+
+route_classes = {
+    'image': _route_class('image', concurrency=4, queue=4, wait=5, client_rate=1, client_burst=10),
+    'chat': _route_class('chat', concurrency=4, queue=8, wait=2, client_rate=2, client_burst=10),
+    'sms': _route_class('sms', concurrency=2, queue=2, wait=2, client_rate=1, client_burst=5),
+    # Job event streams hold their slot until the job ends (up to the Pollinations read timeout)
+    'image_jobs': _route_class('image_jobs', concurrency=12, queue=4, wait=2, client_rate=2, client_burst=20),
+    'default': _route_class('default', client_rate=20, client_burst=100),
+}
+# Endpoint (view function name) -> route class; anything not listed is 'default'
+ROUTE_CLASS_BY_ENDPOINT = {
+    'generate_image': 'image',
+    'generate_image_batch': 'image',
+    'create_image_job': 'image_jobs',
+    'stream_image_job': 'image_jobs',
+    'get_image_job_result': 'image_jobs',
+    'get_cached_image': 'image_jobs',
+    'chat': 'chat',
+    'chat_stream': 'chat',
+    'send_sms': 'sms',
+    'send_sms_bulk': 'sms',
+}
+
+metrics.gauge('admission_active', 'Requests holding an admission slot, by route class', ('class',),
+              lambda: {(name,): rc.gate.active for name, rc in route_classes.items() if rc.gate is not None})
+metrics.gauge('admission_queue_depth', 'Requests waiting for an admission slot, by route class', ('class',),
+              lambda: {(name,): rc.gate.waiting for name, rc in route_classes.items() if rc.gate is not None})
+
+
+def _image_routes_busy():
+    gate = route_classes['image'].gate
+    return ((gate is not None and gate.active + gate.waiting > 0) or image_flight.in_flight() > 0
+            or image_jobs.stats()["pending"] > 0)
+
+
+# Count requests per image parameter set and, while the image routes are idle,
+# fetch the most popular ones missing from the cache within an upstream budget
+# (per worker process). IMAGE_WARM_BUDGET_PER_MINUTE=0 turns warming off.
+IMAGE_WARM_BUDGET_PER_MINUTE = float(os.getenv("IMAGE_WARM_BUDGET_PER_MINUTE", 20))
+IMAGE_WARM_STATE = os.getenv("IMAGE_WARM_STATE", os.path.join(tempfile.gettempdir(), "royal-studio-popular-images.json"))
+popular_images = PopularImages(top_k=int(os.getenv("IMAGE_WARM_TOP_K", 200)))
+image_warmer = CacheWarmer(
+    popular_images,
+    image_cache,
+    lambda params, cache_key: load_image(params, cache_key),
+    image_cache_key,
+    busy=_image_routes_busy,
+    budget_per_minute=IMAGE_WARM_BUDGET_PER_MINUTE,
+    idle_seconds=float(os.getenv("IMAGE_WARM_IDLE_SECONDS", 5)),
+    min_count=int(os.getenv("IMAGE_WARM_MIN_COUNT", 2)),
+    state_path=IMAGE_WARM_STATE or None,
+    warmed=image_cache_warms
+) if IMAGE_WARM_BUDGET_PER_MINUTE > 0 else None
+
+
+_background_workers_started = False
+_background_workers_lock = threading.Lock()
+# Set once the chat backend has warmed up (straight away when there is nothing to warm)
+chat_backend_ready = threading.Event()
+
+
+def _warm_up_chat_backend():
     try:
-        twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-    except Exception as e:
-        print(f"Warning: Failed to initialize Twilio client: {e}")
+        chat_backend.warm_up()
+    except Exception:
+        logger.exception("Chat backend warm-up failed")
+    finally:
+        chat_backend_ready.set()
+
+
+def start_background_workers():
+    """
+    Start work that must not begin before a pre-forking server forks.
+    
+    Called by the server entry points after startup (and lazily on the first
+    request otherwise); only the first call in a process does anything. Only
+    starts threads, so it returns quickly enough for a gunicorn post_fork hook.
+    """
+    global _background_workers_started
+    with _background_workers_lock:
+        if _background_workers_started:
+            return
+        _background_workers_started = True
+    if get_twilio_client() and sms_campaign_store.has_pending():
+        # Resume campaigns left unfinished by a previous process
+        sms_campaign_runner.start()
+    if image_warmer is not None:
+        image_warmer.start()
+    if LOCAL_CHAT_WARM_UP and chat_backend.configured():
+        # Loading the model can outlast the worker timeout; requests meanwhile queue behind it
+        threading.Thread(target=_warm_up_chat_backend, name='chat-warm-up', daemon=True).start()
+    else:
+        chat_backend_ready.set()
+
+
+@app.before_request
+def _start_background_workers_once():
+    # Covers deployments without a server hook (e.g. serverless); a flag check otherwise
+    if not _background_workers_started:
+        start_background_workers()
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+def _client_address():
+    if ADMISSION_CLIENT_HEADER:
+        hops = [hop.strip() for hop in request.headers.get(ADMISSION_CLIENT_HEADER, '').split(',') if hop.strip()]
+        if hops:
+            return hops[max(len(hops) - ADMISSION_TRUSTED_PROXIES, 0)]
+    return request.remote_addr or 'unknown'
+
+
+@app.before_request
+def _admit_request():
+    name = ROUTE_CLASS_BY_ENDPOINT.get(request.endpoint, 'default')
+    try:
+        g.admission = route_classes[name].admit(_client_address())
+    except Overloaded as e:
+        admission_rejections.inc(name, e.reason)
+        if e.reason == CLIENT_RATE:
+            response = jsonify({"status": "error", "error": "Too many requests, please slow down",
+                                "retry_after": e.retry_after})
+            response.status_code = 429
+        else:
+            response = jsonify({"status": "error", "error": "Server is busy, please retry shortly",
+                                "retry_after": e.retry_after})
+            response.status_code = 503
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    admission_queue_wait.observe(g.admission.waited, name)
+
+
+@app.after_request
+def _release_admission_on_close(response):
+    # Streamed responses hold their slot until the last byte is sent
+    ticket = g.pop('admission', None)
+    if ticket is not None:
+        if ticket.gate is None:
+            ticket.release()
+            return response
+        # Werkzeug skips close callbacks for pass-through bodies (send_file); gated
+        # routes only send in-memory images that way, so give up the pass-through
+        response.direct_passthrough = False
+        response.call_on_close(ticket.release)
+    return response
+
+
+@app.teardown_request
+def _release_admission(_):
+    # Requests that never produced a response (after_request did not run)
+    ticket = g.pop('admission', None)
+    if ticket is not None:
+        ticket.release()
+
+
+@app.after_request
+def _record_request_metrics(response):
+    # The URL rule, not the path, so job and campaign ids do not explode label cardinality
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    started = getattr(g, 'request_started', None)
+    if started is not None:
+        http_request_duration.observe(time.perf_counter() - started, request.method, route)
+    http_requests.inc(request.method, route, response.status_code)
+    return response
+
+
+def shutdown(timeout=30):
+    """
+    Drain in-flight work before the process exits.
+    
+    Waits for queued and running image jobs to finish, stops SMS campaign
+    workers after the message each is sending (unsent rows stay queued) and
+    lets in-progress bulk sends complete.
+    """
+    logger.info("Shutting down: draining image jobs and SMS workers")
+    if image_warmer is not None:
+        image_warmer.stop(timeout=timeout)
+    image_jobs.shutdown(wait=True)
+    image_batch_executor.shutdown(wait=True)
+    image_transcode_executor.shutdown(wait=True)
+    sms_campaign_runner.stop(timeout=timeout)
+    sms_executor.shutdown(wait=True)
+    chat_backend.close()
+    huggingface_client.close()
+    pollinations_client.close()
 
 # Note: HUGGINGFACE_API_KEY is not required for current implementation
 # Remove the strict requirement check
@@ -72,10 +495,53 @@ events = [
     }
 ]
 
+# Indexed event catalog: the sample events above, or EVENTS_FILE (JSON or CSV), reloaded when it changes
+event_store = EventStore(
+    events,
+    path=os.getenv("EVENTS_FILE") or None,
+    reload_interval=float(os.getenv("EVENTS_RELOAD_SECONDS", 5))
+)
+
+
+# The built frontend, read and compressed once at startup (before forking under gunicorn)
+FRONTEND_DIST = os.path.join(app.root_path, 'frontend', 'dist')
+static_manifest = StaticManifest(FRONTEND_DIST, brotli_quality=int(os.getenv("STATIC_BROTLI_QUALITY", 11)))
+
+
+def send_static(static_file):
+    """Send a manifest file in the best encoding the client accepts, answering revalidations with 304."""
+    if static_file.body is None:
+        response = send_file(static_file.disk_path, mimetype=static_file.mimetype, conditional=True,
+                             etag=static_file.etag, last_modified=static_file.modified_at)
+    else:
+        encoding, body = static_manifest.select(static_file, request.headers.get('Accept-Encoding'))
+        response = app.response_class(body, content_type=static_file.mimetype)
+        if static_file.variants:
+            response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        # Each encoding is a different representation, so it gets its own ETag
+        response.set_etag(f"{static_file.etag}-{encoding}" if encoding else static_file.etag)
+        response.last_modified = static_file.modified_at
+        response.make_conditional(request)
+    response.headers['Cache-Control'] = static_file.cache_control
+    return response
+
 
 def serve_frontend():
-    """Serve the frontend application."""
-    return send_from_directory(app.static_folder, 'index.html')
+    """Serve the frontend application shell (index.html)."""
+    index_file = static_manifest.index
+    if index_file is None:
+        return jsonify({"error": "Frontend not built"}), 404
+    return send_static(index_file)
+
+
+class FrontendPathConverter(PathConverter):
+    """A path outside /api, so API paths keep their own 404 and 405 responses."""
+    regex = r'(?!api(?:/|$))[^/].*?'
+
+
+app.url_map.converters['frontend_path'] = FrontendPathConverter
 
 
 # Routes
@@ -85,15 +551,251 @@ def index():
     return serve_frontend()
 
 
+@app.route('/<frontend_path:path>', methods=['GET'])
+def static_asset(path):
+    """Serve a file from the frontend build."""
+    static_file = static_manifest.get(path)
+    if static_file is None:
+        abort(404)
+    return send_static(static_file)
+
+
 @app.errorhandler(404)
 def not_found(_):
-    """Handle 404 errors by serving the frontend."""
+    """
+    Handle 404 errors.
+    
+    Unknown API paths get a JSON error and missing files (anything with an
+    extension, or under /assets/) a plain 404; other paths are client-side
+    routes, so they get the frontend shell.
+    """
+    path = request.path
+    if path == '/api' or path.startswith('/api/'):
+        return jsonify({"error": "Not found"}), 404
+    if path.startswith('/assets/') or '.' in path.rsplit('/', 1)[-1]:
+        return app.response_class('Not found', status=404, mimetype='text/plain')
     return serve_frontend()
 
 
+# Using a more reliable conversational model
+HUGGINGFACE_CHAT_MODEL = "facebook/blenderbot-400M-distill"
+HUGGINGFACE_CHAT_PARAMETERS = {
+    "max_new_tokens": 100,
+    "temperature": 0.7,
+    "do_sample": True,
+    "return_full_text": False
+}
+
+
+def build_huggingface_request(user_message, stream=False):
+    """Return (api_url, headers, payload) for a chat completion request."""
+    headers = {
+        "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    
+    api_url = f"{HUGGINGFACE_API_URL}/models/{HUGGINGFACE_CHAT_MODEL}"
+    
+    payload = {
+        "inputs": user_message,
+        "parameters": HUGGINGFACE_CHAT_PARAMETERS
+    }
+    if stream:
+        # Text-generation endpoints then answer with server-sent token events
+        payload["stream"] = True
+    return api_url, headers, payload
+
+
+def record_huggingface_status(status_code):
+    """Count a HuggingFace response that has no body to parse against the circuit breaker."""
+    # Model loading (503), throttling and server errors count against the breaker
+    if status_code == 429 or status_code >= 500:
+        huggingface_breaker.record_failure()
+    else:
+        huggingface_breaker.record_success()
+
+
+def generated_text(result):
+    """Extract the generated text from a HuggingFace result, or None if the format is unexpected."""
+    if isinstance(result, list) and len(result) > 0:
+        return result[0].get('generated_text', '').strip()
+    if isinstance(result, dict) and 'generated_text' in result:
+        return result['generated_text'].strip()
+    return None
+
+
+def handle_huggingface_response(response, user_message):
+    """
+    Turn a HuggingFace response into reply text (without Royal Studio context).
+    
+    Works with requests responses and the async path's aiohttp responses
+    (upstream.BufferedResponse). Returns None when the caller should fall back
+    to manual responses. Records the call's outcome on the circuit breaker
+    once, after the body is parsed: a 200 whose body cannot be read is a
+    failure, and the parse error propagates.
+    """
+    logger.debug("HuggingFace API response status: %s", response.status_code)
+    
+    if response.status_code == 200:
+        try:
+            result = response.json()
+            ai_response = generated_text(result)
+        except Exception:
+            huggingface_breaker.record_failure()
+            raise
+        huggingface_breaker.record_success()
+        logger.debug("HuggingFace API result: %s", result)
+        
+        if ai_response is None:
+            logger.warning("Unexpected HuggingFace response format, falling back to manual responses")
+            return None
+        
+        if ai_response and ai_response != user_message:
+            return ai_response
+        
+    elif response.status_code == 503:
+        record_huggingface_status(response.status_code)
+        logger.info("HuggingFace model is loading, falling back to manual responses")
+        return None
+    else:
+        record_huggingface_status(response.status_code)
+        logger.warning("HuggingFace API error %s: %.200s", response.status_code, response.text)
+        return None
+    
+    # If we reach here, fallback to manual responses
+    logger.info("No valid AI response generated, falling back to manual responses")
+    return None
+
+
+def query_huggingface(user_message):
+    """
+    Ask the HuggingFace model for a reply.
+    
+    Returns the reply text, or None when the caller should fall back to manual
+    responses. Request errors propagate. Each call records one outcome on the
+    circuit breaker.
+    """
+    api_url, headers, payload = build_huggingface_request(user_message)
+    logger.debug("Calling HuggingFace API with message: %s", user_message)
+    try:
+        response = huggingface_client.post(api_url, headers=headers, json=payload)
+    except Exception:
+        # Timeouts and connection errors
+        huggingface_breaker.record_failure()
+        raise
+    return handle_huggingface_response(response, user_message)
+
+
+def stream_huggingface(user_message):
+    """
+    Yield reply text fragments from HuggingFace as they are generated.
+    
+    Yields nothing when the status code calls for a fallback. Request errors
+    propagate, possibly after some fragments were already yielded. Each call
+    records one outcome on the circuit breaker, once the stream has been read.
+    """
+    api_url, headers, payload = build_huggingface_request(user_message, stream=True)
+    logger.debug("Streaming HuggingFace reply for message: %s", user_message)
+    try:
+        response = huggingface_client.post(api_url, headers=headers, json=payload, stream=True)
+    except Exception:
+        huggingface_breaker.record_failure()
+        raise
+    try:
+        if response.status_code != 200:
+            record_huggingface_status(response.status_code)
+            logger.warning("HuggingFace API error %s: %.200s", response.status_code, response.text)
+            return
+        failed = False
+        try:
+            if 'text/event-stream' not in response.headers.get('Content-Type', ''):
+                # Endpoint ignored "stream"; deliver the whole reply as one fragment
+                text = generated_text(response.json())
+                if text:
+                    yield text
+                return
+            for line in response.iter_lines():
+                if not line.startswith(b'data:'):
+                    continue
+                token = json.loads(line[5:]).get('token') or {}
+                if token.get('text') and not token.get('special'):
+                    yield token['text']
+        except Exception:
+            failed = True
+            huggingface_breaker.record_failure()
+            raise
+        finally:
+            # Also a success when the client went away mid-reply
+            if not failed:
+                huggingface_breaker.record_success()
+    finally:
+        response.close()
+
+
+# Where chat replies come from: the hosted HuggingFace API (default) or a
+# small model run in-process on the CPU with dynamically batched generation
+CHAT_BACKEND = os.getenv("CHAT_BACKEND", "huggingface").lower()
+# Warm-up runs per worker in a background thread, started after the fork or on the first request
+LOCAL_CHAT_WARM_UP = os.getenv("LOCAL_CHAT_WARM_UP", "true").lower() == "true"
+if CHAT_BACKEND == 'local':
+    chat_backend = LocalChatBackend(
+        os.getenv("LOCAL_CHAT_MODEL", "facebook/blenderbot_small-90M"),
+        max_new_tokens=int(os.getenv("LOCAL_CHAT_MAX_NEW_TOKENS", 60)),
+        threads=int(os.getenv("LOCAL_CHAT_THREADS", 0)) or None,
+        max_batch_size=int(os.getenv("LOCAL_CHAT_MAX_BATCH_SIZE", 8)),
+        max_wait=float(os.getenv("LOCAL_CHAT_MAX_WAIT_MS", 5)) / 1000,
+        timeout=float(os.getenv("LOCAL_CHAT_TIMEOUT", 30)),
+        batch_sizes=local_chat_batch_size
+    )
+else:
+    chat_backend = HuggingFaceChatBackend(
+        HUGGINGFACE_CHAT_MODEL,
+        HUGGINGFACE_CHAT_PARAMETERS,
+        HUGGINGFACE_API_KEY,
+        query=query_huggingface,
+        stream=stream_huggingface,
+        breaker=huggingface_breaker
+    )
+
+
+def add_chat_context(user_message, reply):
+    """Wrap a generated reply in the Royal Studio context template matching the message, if any."""
+    context = context_intents.match(user_message)
+    return context["template"].format(reply=reply) if context else reply
+
+
+def chat_cache_key(user_message):
+    """Cache key for a chat reply: backend, model, generation parameters and normalized message."""
+    return (chat_backend.name, chat_backend.model, json.dumps(chat_backend.parameters, sort_keys=True),
+            normalize_chat_message(user_message))
+
+
+def _query_and_cache_chat(user_message, cache_key):
+    # Another flight may have filled the cache since the caller checked it
+    ai_response = chat_cache.get(cache_key, count=False)
+    if ai_response is None:
+        ai_response = chat_backend.reply(user_message)
+        # Only real completions are cached; fallbacks are cheap and may be transient
+        if ai_response is not None:
+            ai_response = add_chat_context(user_message, ai_response)
+            chat_cache.put(cache_key, ai_response)
+    return ai_response
+
+
+def get_chat_reply(user_message):
+    """Return a cached or freshly generated reply from the chat backend, or None to fall back."""
+    cache_key = chat_cache_key(user_message)
+    ai_response = chat_cache.get(cache_key)
+    if ai_response is not None:
+        return ai_response
+    # Concurrent identical prompts share one upstream call
+    ai_response, _ = chat_flight.do(cache_key, _query_and_cache_chat, user_message, cache_key)
+    return ai_response
+
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
-    """Handle chat interactions using HuggingFace API."""
+    """Handle chat interactions using the configured chat backend (HuggingFace API by default)."""
     try:
         data = request.get_json()
         user_message = data.get('message', '').strip()
@@ -101,197 +803,282 @@ def chat():
         if not user_message:
             return jsonify({"error": "No message provided"}), 400
 
-        # Check if HuggingFace API key is available
-        if not HUGGINGFACE_API_KEY or HUGGINGFACE_API_KEY == "your_huggingface_api_key_here":
-            # Fallback to manual responses if no API key
-            return get_manual_response(user_message)
+        # Fallback to manual responses if the backend has no API key or model
+        if not chat_backend.configured():
+            return get_manual_response(user_message, chat_backend.unconfigured_reason)
         
-        # Use HuggingFace API for intelligent responses
         try:
-            headers = {
-                "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
-                "Content-Type": "application/json"
-            }
-            
-            # Using a more reliable conversational model
-            api_url = "https://api-inference.huggingface.co/models/facebook/blenderbot-400M-distill"
-            
-            payload = {
-                "inputs": user_message,
-                "parameters": {
-                    "max_new_tokens": 100,
-                    "temperature": 0.7,
-                    "do_sample": True,
-                    "return_full_text": False
-                }
-            }
-            
-            print(f"Calling HuggingFace API with message: {user_message}")
-            response = requests.post(api_url, headers=headers, json=payload, timeout=15)
-            print(f"HuggingFace API response status: {response.status_code}")
-            
-            if response.status_code == 200:
-                result = response.json()
-                print(f"HuggingFace API result: {result}")
-                
-                if isinstance(result, list) and len(result) > 0:
-                    ai_response = result[0].get('generated_text', '').strip()
-                elif isinstance(result, dict) and 'generated_text' in result:
-                    ai_response = result['generated_text'].strip()
-                else:
-                    print("Unexpected API response format, falling back to manual responses")
-                    return get_manual_response(user_message)
-                
-                if ai_response and ai_response != user_message:
-                    # Add Royal Studio context to responses
-                    if any(word in user_message.lower() for word in ['hello', 'hi', 'hey']):
-                        ai_response = f"Hello! I'm your Royal Studio AI assistant. {ai_response}"
-                    elif any(word in user_message.lower() for word in ['help', 'what can you do']):
-                        ai_response = f"{ai_response}\n\nI can also help you with image generation and SMS messaging through Royal Studio!"
-                    elif any(word in user_message.lower() for word in ['name', 'who are you']):
-                        ai_response = f"I'm your Royal Studio AI assistant created by Arun Shekhar. {ai_response}"
-                    
-                    print(f"Returning AI response: {ai_response}")
-                    return jsonify({"response": ai_response})
-                
-            elif response.status_code == 503:
-                print("HuggingFace model is loading, falling back to manual responses")
-                return get_manual_response(user_message)
-            else:
-                print(f"HuggingFace API error {response.status_code}: {response.text}")
-                return get_manual_response(user_message)
+            ai_response = get_chat_reply(user_message)
+            if ai_response is None:
+                return get_manual_response(user_message, 'no_reply')
             
-            # If we reach here, fallback to manual responses
-            print("No valid AI response generated, falling back to manual responses")
-            return get_manual_response(user_message)
+            logger.debug("Returning AI response: %s", ai_response)
+            return jsonify({"response": ai_response})
             
-        except requests.exceptions.Timeout:
-            print("HuggingFace API timeout, falling back to manual responses")
-            return get_manual_response(user_message)
+        except (requests.exceptions.Timeout, TimeoutError):
+            # TimeoutError: the local backend did not produce a reply in time
+            logger.warning("Chat backend timeout, falling back to manual responses")
+            return get_manual_response(user_message, 'timeout')
         except requests.exceptions.RequestException as e:
-            print(f"HuggingFace API error: {str(e)}, falling back to manual responses")
-            return get_manual_response(user_message)
+            logger.warning("HuggingFace API error: %s, falling back to manual responses", e)
+            return get_manual_response(user_message, 'upstream_error')
         except Exception as e:
-            print(f"Unexpected error in HuggingFace API call: {str(e)}, falling back to manual responses")
-            return get_manual_response(user_message)
+            logger.exception("Unexpected error in chat backend, falling back to manual responses")
+            return get_manual_response(user_message, 'unexpected_error')
             
     except Exception as e:
-        print(f"Error in chat endpoint: {str(e)}")
+        logger.exception("Error in chat endpoint")
         return jsonify({"error": "Internal server error"}), 500
 
 
-def get_manual_response(user_message):
-    """Fallback manual responses when HuggingFace API is not available."""
-    user_message_lower = user_message.lower().strip()
+def word_chunks(text):
+    """Split text into word-sized pieces (each keeping its leading whitespace) for chunked delivery."""
+    return re.findall(r'\s*\S+', text)
+
+
+def _stream_chat_reply(user_message, cache_key):
+    # Yields the reply with Royal Studio context around it, caching it once complete
+    context = context_intents.match(user_message)
+    prefix, _, suffix = context["template"].partition('{reply}') if context else ('', '', '')
+    parts = []
+    for fragment in chat_backend.stream(user_message):
+        if not parts:
+            fragment = fragment.lstrip()
+            if not fragment:
+                continue
+            if prefix:
+                parts.append(prefix)
+                yield prefix
+        parts.append(fragment)
+        yield fragment
+    if parts:
+        if suffix:
+            parts.append(suffix)
+            yield suffix
+        chat_cache.put(cache_key, ''.join(parts).strip())
+
+
+def chat_fragments(user_message):
+    """
+    Yield (source, text) fragments of the reply to user_message.
     
-    # Enhanced response logic with more variety
-    if any(word in user_message_lower for word in ['hello', 'hi', 'hey', 'namaste']):
-        responses = [
-            "Hello! Welcome to Royal Studio. How can I assist you today? You can ask me questions, generate images, or send SMS messages.",
-            "Hi there! I'm your Royal Studio AI assistant. What would you like to explore today?",
-            "Namaste! Welcome to the royal experience. How may I serve you today?",
-            "Greetings! Ready to create something amazing together?"
-        ]
-        response = responses[hash(user_message) % len(responses)]
-        
-    elif any(word in user_message_lower for word in ['help', 'what can you do', 'features']):
-        response = "I can help you with:\n• Chat conversations\n• Image generation\n• SMS messaging\n• Event information\n\nWhat would you like to try?"
-        
-    elif any(word in user_message_lower for word in ['name', 'who are you', 'what are you']):
-        responses = [
-            "I'm your Royal Studio AI assistant, created by Arun Shekhar. I'm here to help with chat, images, and SMS!",
-            "I'm the Royal Studio AI - your premium digital companion for creative tasks and conversations.",
-            "I'm an AI assistant built for Royal Studio. I can chat, generate images, and send SMS messages!"
-        ]
-        response = responses[hash(user_message) % len(responses)]
-        
-    elif any(word in user_message_lower for word in ['image', 'picture', 'generate', 'create', 'draw', 'art']):
-        responses = [
-            "To generate images, please go to the 'Image Generator' tab above. You can describe what you want to create!",
-            "I can create amazing images for you! Switch to the Image Generator tab and describe your vision.",
-            "Ready to create some art? Head to the Image Generator tab and let your imagination flow!"
-        ]
-        response = responses[hash(user_message) % len(responses)]
-        
-    elif any(word in user_message_lower for word in ['sms', 'message', 'text', 'phone']):
-        response = "To send SMS messages, please go to the 'SMS' tab above. You'll need to configure Twilio credentials first."
-        
-    elif any(word in user_message_lower for word in ['event', 'hackathon', 'conference']):
-        response = "I can show you upcoming events and hackathons! Check out the events section for more details."
-        
-    elif any(word in user_message_lower for word in ['thank', 'thanks', 'appreciate']):
-        responses = [
-            "You're welcome! I'm here to help. Feel free to ask me anything else.",
-            "My pleasure! Happy to assist you anytime.",
-            "Glad I could help! What else can I do for you?",
-            "You're most welcome! I'm always here for your royal experience."
-        ]
-        response = responses[hash(user_message) % len(responses)]
-        
-    elif any(word in user_message_lower for word in ['bye', 'goodbye', 'exit', 'see you']):
-        responses = [
-            "Goodbye! Have a wonderful day. Come back anytime for more royal experiences!",
-            "Farewell! It was great chatting with you. See you soon!",
-            "Take care! Thanks for visiting Royal Studio. Until next time!",
-            "Goodbye! May your day be filled with creativity and joy!"
-        ]
-        response = responses[hash(user_message) % len(responses)]
-        
-    elif any(word in user_message_lower for word in ['how', 'why', 'what', 'when', 'where']):
-        responses = [
-            "That's a great question! I'm here to help with Royal Studio features. Would you like to know about chat, image generation, or SMS?",
-            "Interesting question! I can assist with various tasks. What specific feature would you like to explore?",
-            "I'd love to help answer that! Tell me more about what you're looking for - images, messages, or just a chat?",
-            "Good question! I'm designed to help with creative tasks and conversations. What can I help you with today?"
-        ]
-        response = responses[hash(user_message) % len(responses)]
-        
-    elif any(word in user_message_lower for word in ['arun', 'developer', 'creator', 'maker']):
-        responses = [
-            "Arun Shekhar is the brilliant mind behind Royal Studio! He's created this premium AI experience for you.",
-            "Yes, Arun Shekhar is my creator and the co-founder of Royal Studio. He's built something amazing here!",
-            "Arun Shekhar developed this entire Royal Studio platform. Pretty impressive, right?"
-        ]
-        response = responses[hash(user_message) % len(responses)]
-        
-    elif any(word in user_message_lower for word in ['good', 'nice', 'awesome', 'cool', 'amazing']):
-        responses = [
-            "Thank you! I'm glad you're enjoying Royal Studio. What would you like to try next?",
-            "That's wonderful to hear! I'm here to make your experience even better.",
-            "I'm so happy you like it! Royal Studio is designed to impress. What shall we do next?",
-            "Fantastic! Your enthusiasm makes my day. How can I help you further?"
-        ]
-        response = responses[hash(user_message) % len(responses)]
+    HuggingFace tokens are passed through as they arrive; cached replies and
+    manual fallbacks are split into words so clients handle one event shape.
+    The source of backend fragments is the backend's name.
+    """
+    reason = chat_backend.unconfigured_reason
+    if chat_backend.configured():
+        cache_key = chat_cache_key(user_message)
+        cached = chat_cache.get(cache_key)
+        if cached is not None:
+            for chunk in word_chunks(cached):
+                yield 'cache', chunk
+            return
         
-    else:
-        # More varied fallback responses
-        fallback_responses = [
-            "That's interesting! I'm your Royal Studio AI assistant. I can help with chat, image generation, or SMS. What would you like to explore?",
-            "I'd love to help you with that! I specialize in conversations, creating images, and sending messages. Which interests you?",
-            "Great question! As your Royal Studio assistant, I can chat, generate amazing images, or help with SMS. What sounds fun?",
-            "I'm here to assist! Whether you want to chat, create art, or send messages - I've got you covered. What's your preference?",
-            "Fascinating! I'm designed to help with various tasks at Royal Studio. Would you like to try image generation, SMS, or just continue chatting?"
-        ]
-        response = fallback_responses[hash(user_message) % len(fallback_responses)]
+        reason = 'no_reply'
+        started = False
+        try:
+            for fragment in _stream_chat_reply(user_message, cache_key):
+                started = True
+                yield chat_backend.name, fragment
+        except (requests.exceptions.RequestException, TimeoutError, ValueError) as e:
+            # ValueError: a malformed event in the stream
+            if started:
+                # The client already has part of the reply; end it there
+                logger.warning("Chat stream interrupted: %s", e)
+                return
+            logger.warning("Chat backend error: %s, falling back to manual responses", e)
+            reason = 'timeout' if isinstance(e, (requests.exceptions.Timeout, TimeoutError)) else 'upstream_error'
+        if started:
+            return
     
-    return jsonify({"response": response})
+    manual = select_manual_response(user_message)
+    manual_responses.inc(reason, manual.intent)
+    for chunk in word_chunks(manual.text):
+        yield 'manual', chunk
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Stream a chat reply as server-sent events while it is being generated.
+    
+    Accepts the same JSON payload as /api/chat and sends:
+        event: token  data: {"text": "..."}   one per reply fragment
+        event: done   data: {"response": full reply, "source": "huggingface" | "local" | "cache" | "manual",
+                             "ttft_ms": time to first token, "total_ms": total time}
+    Manual fallback replies arrive as word-sized token events, so clients need
+    only one code path.
+    """
+    data = request.get_json(silent=True) or {}
+    user_message = str(data.get('message', '')).strip()
+    if not user_message:
+        return jsonify({"error": "No message provided"}), 400
+    started = time.perf_counter()
+    
+    def generate():
+        parts = []
+        source = 'manual'
+        ttft = None
+        try:
+            for source, fragment in chat_fragments(user_message):
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                    chat_time_to_first_token.observe(ttft, source)
+                parts.append(fragment)
+                yield sse_event('token', {"text": fragment})
+        except Exception:
+            logger.exception("Error in chat stream")
+            yield sse_event('error', {"error": "Internal server error"})
+        yield sse_event('done', {
+            "response": ''.join(parts).strip(),
+            "source": source,
+            "ttft_ms": round(ttft * 1000, 1) if ttft is not None else None,
+            "total_ms": round((time.perf_counter() - started) * 1000, 1)
+        })
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@app.route('/api/chat-stats', methods=['GET'])
+def chat_stats():
+    """
+    Report chat response cache and upstream request coalescing counters.
+    """
+    return jsonify({
+        "status": "success",
+        "cache": chat_cache.stats(),
+        "upstream": chat_flight.stats(),
+        "client": huggingface_client.stats(),
+        "breaker": huggingface_breaker.stats(),
+        "backend": chat_backend.stats(),
+        "ready": chat_backend_ready.is_set()
+    })
+
+
+MANUAL_RESPONSE_MAX_AGE = 3600
+
+
+def get_manual_response(user_message, reason):
+    """
+    Fallback manual responses when HuggingFace API is not available.
+    
+    reason says why the fallback was used (no_api_key, no_model, no_reply,
+    timeout, upstream_error, unexpected_error) and labels the fallback counter.
+    """
+    # Replies are a pure function of the message, so they can be cached anywhere
+    manual = select_manual_response(user_message)
+    manual_responses.inc(reason, manual.intent)
+    response = app.response_class(manual.body, mimetype='application/json')
+    response.set_etag(manual.etag)
+    response.headers['Cache-Control'] = f'public, max-age={MANUAL_RESPONSE_MAX_AGE}'
+    response.headers['X-Response-Source'] = 'manual'
+    return response
+
+
+EVENTS_MAX_PAGE_SIZE = 1000
+
+
+def event_query_from_args(args):
+    """
+    Read event filters from query parameters.
+    
+    location (comma-separated, case-insensitive), from and to (inclusive
+    YYYY-MM-DD dates), limit (page size, 1-1000; all matches when omitted) and
+    cursor (from the previous page's X-Next-Cursor header or next_cursor field).
+    """
+    locations = tuple(sorted({name.strip().lower() for name in args.get('location', '').split(',') if name.strip()}))
+    start = parse_event_date(args['from'], 'from') if args.get('from') else None
+    end = parse_event_date(args['to'], 'to') if args.get('to') else None
+    limit = None
+    if args.get('limit'):
+        try:
+            limit = int(args['limit'])
+        except ValueError:
+            raise InvalidEventQuery("'limit' must be an integer")
+        if not 1 <= limit <= EVENTS_MAX_PAGE_SIZE:
+            raise InvalidEventQuery(f"'limit' must be between 1 and {EVENTS_MAX_PAGE_SIZE}")
+    return {
+        "locations": locations or None,
+        "start": start,
+        "end": end,
+        "cursor": args.get('cursor') or None,
+        "limit": limit
+    }
+
+
+def catalog_response(catalog, key, build):
+    """
+    Serve a serialization of the event catalog, memoized per catalog version.
+    
+    build() returns (payload, next_cursor). The ETag is a hash of the body and
+    Last-Modified is the catalog's load time, so unchanged catalogs get a 304.
+    """
+    def serialize():
+        payload, next_cursor = build()
+        body = json.dumps(payload).encode('utf-8')
+        return body, hashlib.sha1(body).hexdigest(), next_cursor
+    
+    body, etag, next_cursor = catalog.cached(key, serialize)
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.last_modified = catalog.modified_at
+    # Clients may reuse the body but must revalidate, since the catalog can reload
+    response.headers['Cache-Control'] = 'no-cache'
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+        next_url = f"{request.path}?{urllib.parse.urlencode({**request.args.to_dict(), 'cursor': next_cursor})}"
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+    return response.make_conditional(request)
+
+
+def invalid_event_query_response(error):
+    return jsonify({"status": "error", "error": str(error)}), 400
 
 
 @app.route('/api/events', methods=['GET'])
 def get_events():
-    """Get the list of events."""
+    """
+    Get the list of events, optionally filtered and paginated.
+    
+    See event_query_from_args() for the query parameters. The response stays a
+    plain JSON list; the next page's cursor is in the X-Next-Cursor header.
+    """
     try:
-        return jsonify(events)
+        query = event_query_from_args(request.args)
+        catalog = event_store.catalog
+        return catalog_response(catalog, ('events', tuple(query.items())), lambda: catalog.query(**query))
+    except InvalidEventQuery as e:
+        return invalid_event_query_response(e)
     except Exception as e:
-        print(f"Error getting events: {str(e)}")
+        logger.exception("Error getting events")
         return jsonify({"error": "Failed to fetch events"}), 500
 
 
+@app.route('/api/events/<event_id>', methods=['GET'])
+def get_event(event_id):
+    """Get a single event by id."""
+    catalog = event_store.catalog
+    event = catalog.get(event_id)
+    if event is None:
+        return jsonify({"status": "error", "error": "Event not found"}), 404
+    return catalog_response(catalog, ('event', str(event['id'])), lambda: (event, None))
+
+
 @app.route('/api/hackathons', methods=['GET'])
 def get_hackathons():
     """
     API endpoint to get a list of hackathons.
     
+    Accepts the same filters and pagination parameters as /api/events.
+    
     Returns:
         JSON: A list of hackathon objects with the following structure:
             [
@@ -304,44 +1091,302 @@ def get_hackathons():
                 },
                 ...
             ]
+        wrapped in {"status", "count", "data", "message", "next_cursor"}.
     """
     try:
-        # Example of how to fetch data from an external API if you had one.
-        # This part is commented out as we don't have a specific API URL.
-        # api_url = "https://example.com/api/hackathons-india"
-        # response = requests.get(api_url)
-        # response.raise_for_status() # Raise an exception for bad status codes
-        # hackathons = response.json()
-
-        # For now, we return the sample data.
-        hackathons = events
-
-        # Return the hackathon data as a JSON response with success status
-        return jsonify({
-            "status": "success",
-            "count": len(hackathons),
-            "data": hackathons,
-            "message": "Hackathons retrieved successfully"
-        })
-
-    except requests.exceptions.RequestException as e:
-        # Log the error for debugging
-        print(f"API Request Error: {str(e)}")
-        return jsonify({
-            "status": "error",
-            "error": "Failed to fetch data from external API",
-            "details": str(e)
-        }), 500
+        query = event_query_from_args(request.args)
+        catalog = event_store.catalog
+        
+        def build():
+            hackathons, next_cursor = catalog.query(**query)
+            # Return the hackathon data as a JSON response with success status
+            return {
+                "status": "success",
+                "count": len(hackathons),
+                "data": hackathons,
+                "message": "Hackathons retrieved successfully",
+                "next_cursor": next_cursor
+            }, next_cursor
         
+        return catalog_response(catalog, ('hackathons', tuple(query.items())), build)
+
+    except InvalidEventQuery as e:
+        return invalid_event_query_response(e)
     except Exception as e:
         # Log unexpected errors
-        print(f"Unexpected Error: {str(e)}")
+        logger.exception("Unexpected Error")
         return jsonify({ 
             "status": "error",
             "error": "An unexpected error occurred",
             "details": str(e)
         }), 500
 
+IMAGE_CACHE_MAX_AGE = 31536000
+
+
+def build_pollinations_url(params):
+    """Build the Pollinations image URL for normalized generation parameters."""
+    # URL encode the prompt to handle special characters
+    encoded_prompt = urllib.parse.quote(params['prompt'])
+    return (
+        f"{POLLINATIONS_BASE_URL}/p/{encoded_prompt}"
+        f"?width={params['width']}&height={params['height']}&seed={params['seed']}&model={params['model']}"
+    )
+
+
+POLLINATIONS_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+IMAGE_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def fetch_pollinations_image(params):
+    """Download a generated image from Pollinations and return its bytes."""
+    image_url = build_pollinations_url(params)
+    logger.debug("Generating image with URL: %s", image_url)
+    
+    # Download the image with proper headers
+    response = pollinations_client.get(image_url, headers=POLLINATIONS_HEADERS)
+    response.raise_for_status()
+    
+    logger.debug("Image response status: %s, content type: %s",
+                 response.status_code, response.headers.get('content-type'))
+    return response.content
+
+
+def open_pollinations_stream(params):
+    """Start a streamed Pollinations download; the caller must close the response."""
+    image_url = build_pollinations_url(params)
+    logger.debug("Streaming image from URL: %s", image_url)
+    
+    response = pollinations_client.get(image_url, headers=POLLINATIONS_HEADERS, stream=True)
+    try:
+        response.raise_for_status()
+    except requests.exceptions.RequestException:
+        response.close()
+        raise
+    return response
+
+
+# Streamed misses in progress (cache key -> Event set when the stream ends), so
+# identical requests wait for the cached image instead of fetching it again
+_image_streams = {}
+_image_streams_lock = threading.Lock()
+
+
+def claim_image_stream(cache_key):
+    """Register a stream for cache_key and return None, or return the Event of one already running."""
+    with _image_streams_lock:
+        running = _image_streams.get(cache_key)
+        if running is None:
+            _image_streams[cache_key] = threading.Event()
+        return running
+
+
+def _release_image_stream(cache_key):
+    with _image_streams_lock:
+        done = _image_streams.pop(cache_key, None)
+    if done is not None:
+        done.set()
+
+
+def wait_for_image_stream(cache_key):
+    """If an identical stream is running, wait (up to the read timeout) for it to finish."""
+    with _image_streams_lock:
+        running = _image_streams.get(cache_key)
+    if running is not None:
+        running.wait(pollinations_client.timeout[1])
+
+
+def stream_image(params, cache_key):
+    """
+    Proxy upstream image chunks straight to the client without buffering.
+    
+    The caller must have claimed cache_key with claim_image_stream(); the
+    claim is released when the stream ends or fails.
+    
+    The stream is teed into the disk cache and only committed once the whole
+    body (matching Content-Length, when given) has been received. requests
+    decodes a Content-Encoding (e.g. gzip) from the upstream, so the encoded
+    Content-Length is neither forwarded nor checked then; urllib3 raises on a
+    short encoded body instead.
+    """
+    try:
+        upstream = open_pollinations_stream(params)
+    except Exception:
+        _release_image_stream(cache_key)
+        raise
+    content_length = None if upstream.headers.get('Content-Encoding') else upstream.headers.get('Content-Length')
+    try:
+        writer = image_cache.open_writer(cache_key)
+    except OSError:
+        upstream.close()
+        _release_image_stream(cache_key)
+        raise
+    
+    def finish():
+        # An unfinished download is never cached
+        writer.discard()
+        upstream.close()
+        _release_image_stream(cache_key)
+    
+    def generate():
+        try:
+            for chunk in upstream.iter_content(chunk_size=IMAGE_STREAM_CHUNK_SIZE):
+                if chunk:
+                    writer.write(chunk)
+                    yield chunk
+            if content_length is None or writer.size == int(content_length):
+                writer.commit()
+            image_response_bytes.observe(writer.size, 'MISS')
+        finally:
+            finish()
+    
+    headers = {
+        'Content-Disposition': f'attachment; filename=generated_{uuid.uuid4().hex}.jpg',
+        'Cache-Control': f'public, max-age={IMAGE_CACHE_MAX_AGE}',
+        'ETag': f'"{cache_key}"',
+        'X-Cache': 'MISS'
+    }
+    if content_length is not None:
+        headers['Content-Length'] = content_length
+    if TRANSCODING_AVAILABLE:
+        # The same URL serves variants for other Accept headers
+        headers['Vary'] = 'Accept'
+    # finish() also runs when the response is closed before the generator started
+    return Response(
+        ClosingIterator(generate(), finish),
+        mimetype=upstream.headers.get('Content-Type', 'image/jpeg'),
+        headers=headers,
+        direct_passthrough=True
+    )
+
+
+def _fetch_and_cache_image(params, cache_key):
+    wait_for_image_stream(cache_key)
+    # Another flight or a stream may have filled the cache since the caller checked it
+    image_bytes = image_cache.get(cache_key, count=False)
+    if image_bytes is None:
+        image_bytes = fetch_pollinations_image(params)
+        image_cache.put(cache_key, image_bytes)
+    return image_bytes
+
+
+def load_image(params, cache_key):
+    """
+    Return (image_bytes, cache_status) for normalized parameters.
+
+    cache_status is 'HIT' when served from the cache, 'COALESCED' when the bytes
+    came from another request's in-flight fetch, and 'MISS' otherwise.
+    """
+    image_bytes = image_cache.get(cache_key)
+    if image_bytes is not None:
+        return image_bytes, 'HIT'
+    image_bytes, shared = image_flight.do(cache_key, _fetch_and_cache_image, params, cache_key)
+    return image_bytes, 'COALESCED' if shared else 'MISS'
+
+
+def _transcode_and_cache(load_original, options, key):
+    image_bytes = image_cache.get(key, count=False)
+    if image_bytes is None:
+        original = load_original()
+        with image_transcode_duration.time(options.format):
+            image_bytes = image_transcode_executor.submit(transcode, original, options).result()
+        image_cache.put(key, image_bytes)
+    return image_bytes
+
+
+def load_image_variant(cache_key, options, load_original):
+    """
+    Return (image_bytes, cache_status) for a resized/re-encoded variant.
+    
+    The variant is cached next to the original. On a miss, load_original() must
+    return the original bytes, which are transcoded on the transcode pool.
+    cache_status describes the variant itself.
+    """
+    key = variant_key(cache_key, options)
+    image_bytes = image_cache.get(key)
+    if image_bytes is not None:
+        return image_bytes, 'HIT'
+    image_bytes, shared = image_flight.do(key, _transcode_and_cache, load_original, options, key)
+    return image_bytes, 'COALESCED' if shared else 'MISS'
+
+
+def image_params_from_payload(data):
+    """Read generation parameters from a request payload, applying defaults."""
+    data = data or {}
+    
+    # Set default values if not provided
+    prompt = data.get('prompt', 'A beautiful landscape')
+    width = data.get('width', 1024)
+    height = data.get('height', 1024)
+    seed = data.get('seed', 42)
+    model = 'flux'  # Default model
+    
+    return normalize_image_params(prompt, width, height, seed, model)
+
+
+def image_etag(cache_key, variant):
+    return variant_key(cache_key, variant) if variant is not None else cache_key
+
+
+def send_image(image_bytes, cache_key, cache_status, variant=None):
+    """Return cached image bytes as a downloadable file tagged with its (variant) cache key."""
+    mimetype = variant_mimetype(variant) if variant is not None else 'image/jpeg'
+    extension = variant_extension(variant) if variant is not None else 'jpg'
+    # Generate a unique filename
+    filename = f"generated_{uuid.uuid4().hex}.{extension}"
+    
+    response = send_file(
+        BytesIO(image_bytes),
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=filename,
+        etag=image_etag(cache_key, variant),
+        max_age=IMAGE_CACHE_MAX_AGE
+    )
+    response.headers['X-Cache'] = cache_status
+    if TRANSCODING_AVAILABLE:
+        response.vary.add('Accept')
+    image_response_bytes.observe(len(image_bytes), cache_status)
+    return response
+
+
+def image_not_modified(etag):
+    response = app.response_class(status=304)
+    response.set_etag(etag)
+    if TRANSCODING_AVAILABLE:
+        response.vary.add('Accept')
+    return response
+
+
+def send_cached_image(cache_key, variant):
+    """Send an image (or a variant of it) that is already cached; None if it has been evicted."""
+    etag = image_etag(cache_key, variant)
+    if request.if_none_match.contains(etag):
+        return image_not_modified(etag)
+    
+    # A cached variant is served even if the original has since been evicted
+    image_bytes = image_cache.get(etag) if variant is not None else None
+    cache_status = 'HIT'
+    if image_bytes is None:
+        original = image_cache.get(cache_key)
+        if original is None:
+            return None
+        image_bytes = original
+        if variant is not None:
+            image_bytes, cache_status = load_image_variant(cache_key, variant, lambda: original)
+    return send_image(image_bytes, cache_key, cache_status, variant)
+
+
+def invalid_variant_response(error):
+    return jsonify({
+        "status": "error",
+        "error": str(error),
+        "formats": supported_formats()
+    }), 400
+
+
 @app.route('/api/generate-image', methods=['POST'])
 def generate_image():
     """
@@ -352,61 +1397,55 @@ def generate_image():
         "prompt": "A beautiful landscape",
         "width": 1024,
         "height": 1024,
-        "seed": 42
+        "seed": 42,
+        "stream": false
     }
+    
+    With "stream": true (or ?stream=1), a cache miss is piped from Pollinations
+    to the client chunk by chunk instead of being downloaded first.
+    
+    Optional query parameters resize and re-encode the image (requires Pillow):
+        format (str): jpeg (progressive), webp, avif or auto; auto (the default)
+            picks WebP/AVIF when the Accept header lists them
+        max_side (int): downscale so neither side exceeds this many pixels
+        quality (int): encoder quality, 1-100
     """
     try:
-        data = request.get_json()
-        
-        # Set default values if not provided
-        prompt = data.get('prompt', 'A beautiful landscape')
-        width = data.get('width', 1024)
-        height = data.get('height', 1024)
-        seed = data.get('seed', 42)
-        model = 'flux'  # Default model
-        
-        # URL encode the prompt to handle special characters
-        import urllib.parse
-        encoded_prompt = urllib.parse.quote(prompt)
-        
-        # Generate image URL
-        image_url = f"https://pollinations.ai/p/{encoded_prompt}?width={width}&height={height}&seed={seed}&model={model}"
-        
-        print(f"Generating image with URL: {image_url}")
-        
-        # Download the image with proper headers
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(image_url, headers=headers, timeout=120)
-        response.raise_for_status()
-        
-        print(f"Image response status: {response.status_code}")
-        print(f"Content type: {response.headers.get('content-type')}")
+        data = request.get_json() or {}
+        params = image_params_from_payload(data)
+        cache_key = image_cache_key(params)
+        popular_images.record(params, cache_key)
+        variant = parse_variant_options(request.args, request.headers.get('Accept'))
         
-        # Generate a unique filename
-        filename = f"generated_{uuid.uuid4().hex}.jpg"
+        # The image is fully determined by its parameters, so the key doubles as the ETag
+        etag = image_etag(cache_key, variant)
+        if request.if_none_match.contains(etag):
+            return image_not_modified(etag)
         
-        # Save the image temporarily
-        image_data = BytesIO(response.content)
+        streaming = data.get('stream') is True or request.args.get('stream') == '1'
+        if (streaming and variant is None and cache_key not in image_cache
+                and not image_flight.in_flight(cache_key) and claim_image_stream(cache_key) is None):
+            return stream_image(params, cache_key)
+        # Otherwise an identical fetch may be running: load_image joins its flight or waits for its stream
         
-        # Return the image directly
-        return send_file(
-            image_data,
-            mimetype='image/jpeg',
-            as_attachment=True,
-            download_name=filename
-        )
+        if variant is not None:
+            image_bytes, cache_status = load_image_variant(
+                cache_key, variant, lambda: load_image(params, cache_key)[0])
+        else:
+            image_bytes, cache_status = load_image(params, cache_key)
+        return send_image(image_bytes, cache_key, cache_status, variant)
         
+    except InvalidVariantOptions as e:
+        return invalid_variant_response(e)
     except requests.exceptions.RequestException as e:
-        print(f"Request error: {str(e)}")
+        logger.error("Image request error: %s", e)
         return jsonify({
             "status": "error",
             "error": "Failed to generate image",
             "details": str(e)
         }), 500
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
+        logger.exception("Unexpected error")
         return jsonify({ 
             "status": "error",
             "error": "An unexpected error occurred",
@@ -414,6 +1453,277 @@ def generate_image():
         }), 500
 
 
+def _image_job_payload(snapshot):
+    job_id = snapshot["job_id"]
+    payload = dict(snapshot)
+    payload["status_url"] = f"/api/generate-image/jobs/{job_id}"
+    payload["events_url"] = f"/api/generate-image/jobs/{job_id}/events"
+    if snapshot["state"] == DONE:
+        payload["image_url"] = f"/api/generate-image/jobs/{job_id}/image"
+    return payload
+
+
+@app.route('/api/generate-image/jobs', methods=['POST'])
+def create_image_job():
+    """
+    Start generating an image in the background and return a job id at once.
+    
+    Accepts the same JSON payload as /api/generate-image. Poll the returned
+    status_url, or subscribe to events_url for server-sent progress events.
+    """
+    try:
+        params = image_params_from_payload(request.get_json(silent=True))
+        cache_key = image_cache_key(params)
+        popular_images.record(params, cache_key)
+        
+        if cache_key in image_cache:
+            job = image_jobs.complete(cache_key, 'HIT')
+        else:
+            job = image_jobs.submit(cache_key, load_image, params, cache_key)
+        
+        return jsonify({"status": "success", **_image_job_payload(job.to_dict())}), 202
+        
+    except JobQueueFull as e:
+        return jsonify({
+            "status": "error",
+            "error": "Image generation queue is full, please retry shortly",
+            "details": str(e)
+        }), 503
+    except Exception as e:
+        logger.exception("Unexpected error")
+        return jsonify({
+            "status": "error",
+            "error": "An unexpected error occurred",
+            "details": str(e)
+        }), 500
+
+
+@app.route('/api/generate-image/jobs/<job_id>', methods=['GET'])
+def get_image_job(job_id):
+    """
+    Poll the state of an image generation job.
+    """
+    job = image_jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "error": "Job not found"}), 404
+    return jsonify({"status": "success", **_image_job_payload(job.to_dict())})
+
+
+@app.route('/api/generate-image/jobs/<job_id>/events', methods=['GET'])
+def stream_image_job(job_id):
+    """
+    Stream job state changes (queued, fetching, done, error) as server-sent events.
+    """
+    job = image_jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "error": "Job not found"}), 404
+    
+    def generate():
+        version = -1
+        while True:
+            new_version, snapshot = image_jobs.wait_for_change(job, version, timeout=IMAGE_JOB_KEEPALIVE_SECONDS)
+            if new_version == version:
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            version = new_version
+            yield f"event: {snapshot['state']}\ndata: {json.dumps(_image_job_payload(snapshot))}\n\n"
+            if snapshot["state"] in (DONE, ERROR):
+                return
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@app.route('/api/generate-image/jobs/<job_id>/image', methods=['GET'])
+def get_image_job_result(job_id):
+    """
+    Return the finished image for a job from the image cache.
+    
+    Accepts the format, max_side and quality options of /api/generate-image.
+    """
+    try:
+        variant = parse_variant_options(request.args, request.headers.get('Accept'))
+    except InvalidVariantOptions as e:
+        return invalid_variant_response(e)
+    
+    job = image_jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "error": "Job not found"}), 404
+    if job.state != DONE:
+        return jsonify({
+            "status": "error",
+            "error": "Image is not ready",
+            "state": job.state,
+            "details": job.error
+        }), 409
+    
+    response = send_cached_image(job.cache_key, variant)
+    if response is None:
+        return jsonify({"status": "error", "error": "Image expired from cache, please submit the job again"}), 410
+    return response
+
+
+def _batch_results(items, results):
+    # Yield (manifest entry, image bytes or None) for each finished batch item
+    for index, result, error in results:
+        params, cache_key = items[index]
+        entry = {
+            "index": index,
+            "id": cache_key,
+            "url": f"/api/images/{cache_key}",
+            "prompt": params["prompt"],
+            "width": params["width"],
+            "height": params["height"],
+            "seed": params["seed"],
+        }
+        if error is None:
+            image_bytes, cache_status = result
+            entry.update(status="success", cache=cache_status, bytes=len(image_bytes))
+            yield entry, image_bytes
+        else:
+            entry.update(status="error", error="Failed to generate image", details=str(error))
+            yield entry, None
+
+
+def _stream_batch_manifest(items, results):
+    def generate():
+        succeeded = 0
+        try:
+            for entry, image_bytes in _batch_results(items, results):
+                succeeded += image_bytes is not None
+                yield json.dumps(entry) + "\n"
+            yield json.dumps({"status": "complete", "total": len(items), "succeeded": succeeded}) + "\n"
+        finally:
+            results.close()
+    
+    return Response(generate(), mimetype='application/x-ndjson', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+def _stream_batch_zip(items, results):
+    def generate():
+        archive = ZipStream()
+        manifest = []
+        try:
+            for entry, image_bytes in _batch_results(items, results):
+                manifest.append(entry)
+                if image_bytes is not None:
+                    entry["file"] = f"{entry['index']:02d}_{entry['id'][:16]}.jpg"
+                    yield archive.add(entry["file"], image_bytes)
+            yield archive.add('manifest.json', json.dumps(manifest, indent=2))
+            yield archive.close()
+        finally:
+            results.close()
+    
+    return Response(generate(), mimetype='application/zip', headers={
+        'Content-Disposition': f'attachment; filename=generated_{uuid.uuid4().hex}.zip',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@app.route('/api/generate-image/batch', methods=['POST'])
+def generate_image_batch():
+    """
+    Generate several images concurrently, streaming each result as it finishes.
+    
+    Expected JSON payload:
+    {
+        "images": [
+            {"prompt": "A beautiful landscape", "width": 1024, "height": 1024, "seed": 1},
+            {"prompt": "A beautiful landscape", "width": 512, "height": 512, "seed": 2}
+        ],
+        "output": "manifest"
+    }
+    
+    With "output": "manifest" (the default) the response is newline-delimited
+    JSON: one line per image in completion order, carrying its id and a URL
+    under /api/images/, then a summary line. With "output": "zip" the images
+    are streamed as a zip archive, followed by manifest.json.
+    """
+    data = request.get_json(silent=True) or {}
+    specs = data.get('images')
+    output = data.get('output') or request.args.get('output', 'manifest')
+    
+    if not isinstance(specs, list) or not specs or not all(isinstance(spec, dict) for spec in specs):
+        return jsonify({
+            "status": "error",
+            "error": "Provide 'images' as a non-empty list of {prompt, width, height, seed} objects"
+        }), 400
+    if len(specs) > IMAGE_BATCH_MAX_ITEMS:
+        return jsonify({
+            "status": "error",
+            "error": f"A batch can contain at most {IMAGE_BATCH_MAX_ITEMS} images"
+        }), 400
+    if output not in ('manifest', 'zip'):
+        return jsonify({"status": "error", "error": "'output' must be 'manifest' or 'zip'"}), 400
+    
+    items = []
+    for spec in specs:
+        params = image_params_from_payload(spec)
+        cache_key = image_cache_key(params)
+        popular_images.record(params, cache_key)
+        items.append((params, cache_key))
+    
+    # Identical specs, here or in other requests, share one fetch through image_flight
+    results = run_batch(image_batch_executor, lambda item: load_image(*item), items)
+    if output == 'zip':
+        return _stream_batch_zip(items, results)
+    return _stream_batch_manifest(items, results)
+
+
+IMAGE_ID_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+
+@app.route('/api/images/<image_id>', methods=['GET'])
+def get_cached_image(image_id):
+    """
+    Return a generated image by id (its cache key), as listed in batch manifests.
+    
+    Accepts the format, max_side and quality options of /api/generate-image.
+    """
+    if not IMAGE_ID_PATTERN.fullmatch(image_id):
+        return jsonify({"status": "error", "error": "Image not found"}), 404
+    try:
+        variant = parse_variant_options(request.args, request.headers.get('Accept'))
+    except InvalidVariantOptions as e:
+        return invalid_variant_response(e)
+    
+    response = send_cached_image(image_id, variant)
+    if response is None:
+        return jsonify({"status": "error", "error": "Image not found or expired from cache"}), 404
+    return response
+
+
+@app.route('/api/image-stats', methods=['GET'])
+def image_stats():
+    """
+    Report image cache, upstream request coalescing and cache warming counters.
+    """
+    return jsonify({
+        "status": "success",
+        "cache": image_cache.stats(),
+        "upstream": image_flight.stats(),
+        "jobs": image_jobs.stats(),
+        "client": pollinations_client.stats(),
+        "warmer": image_warmer.stats() if image_warmer is not None else None,
+        "variant_formats": supported_formats()
+    })
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Expose request, upstream, fallback and image size metrics for Prometheus.
+    """
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+
 @app.route('/api/send-sms', methods=['POST'])
 def send_sms():
     """
@@ -426,6 +1736,7 @@ def send_sms():
     }
     """
     try:
+        twilio_client = get_twilio_client()
         if not twilio_client:
             return jsonify({
                 "status": "error",
@@ -485,10 +1796,15 @@ def send_sms_bulk():
     Expected JSON payload:
     {
         "to": ["+1234567890", "+1987654321"],
-        "message": "Hello from your chatbot!"
+        "message": "Hello from your chatbot!",
+        "mode": "campaign"
     }
+    
+    "mode" is optional. With "campaign", recipients are queued durably and sent
+    in the background; the response carries a campaign_id for /api/sms-campaigns.
     """
     try:
+        twilio_client = get_twilio_client()
         if not twilio_client:
             return jsonify({
                 "status": "error",
@@ -509,20 +1825,12 @@ def send_sms_bulk():
                 "error": "Provide a non-empty 'message' and at least one recipient in 'to'"
             }), 400
 
-        def normalize_phone(number: str) -> str:
-            # Remove spaces, dashes, parentheses
-            cleaned = ''.join(ch for ch in number.strip() if ch.isdigit() or ch == '+')
-            # Ensure leading '+' and at least country code + number length
-            if not cleaned.startswith('+'):
-                # If the number starts with country code digits (common in copies), reject to avoid wrong sends
-                return ''
-            return cleaned
-
         results = []
-        success_count = 0
+        pending = []
 
         for raw_number in to_numbers:
-            normalized = normalize_phone(str(raw_number))
+            # Only strings are numbers: str() of a dict or list could still normalize to one
+            normalized = normalize_phone(raw_number) if isinstance(raw_number, str) else ''
             if not normalized:
                 results.append({
                     "to": raw_number,
@@ -530,31 +1838,40 @@ def send_sms_bulk():
                     "error": "Invalid number format. Use international format like +1234567890"
                 })
                 continue
+            pending.append((len(results), normalized))
+            results.append(None)
 
-            try:
-                message = twilio_client.messages.create(
-                    body=message_text,
-                    from_=TWILIO_PHONE_NUMBER,
-                    to=normalized
-                )
-                results.append({
-                    "to": normalized,
-                    "status": "success",
-                    "sid": message.sid
-                })
-                success_count += 1
-            except TwilioRestException as e:
-                results.append({
-                    "to": normalized,
-                    "status": "error",
-                    "error": str(e)
-                })
-            except Exception as e:
-                results.append({
-                    "to": normalized,
-                    "status": "error",
-                    "error": str(e)
-                })
+        if data.get('mode') == 'campaign':
+            # Invalid numbers are stored as failed rows so positions match the 'to' list;
+            # the raw entry may be null or not a string at all
+            recipients = [
+                ('' if result["to"] is None else str(result["to"]), result["error"]) if result else None
+                for result in results
+            ]
+            for index, normalized in pending:
+                recipients[index] = (normalized, None)
+            campaign_id = sms_campaign_store.create(message_text, recipients)
+            sms_campaign_runner.start()
+            sms_campaign_runner.notify()
+            return jsonify({
+                "status": "queued",
+                "campaign_id": campaign_id,
+                "total": len(results),
+                "status_url": f"/api/sms-campaigns/{campaign_id}"
+            }), 202
+
+        # Send valid numbers concurrently, paced to the sender's messages-per-second limit
+        sent = send_bulk(
+            twilio_client,
+            TWILIO_PHONE_NUMBER,
+            message_text,
+            [number for _, number in pending],
+            sms_executor,
+            limiter=sms_rate_limiter
+        )
+        for (index, _), result in zip(pending, sent):
+            results[index] = result
+        success_count = sum(1 for result in results if result["status"] == "success")
 
         return jsonify({
             "status": "partial-success" if success_count != len(results) else "success",
@@ -570,11 +1887,36 @@ def send_sms_bulk():
             "details": str(e)
         }), 500
 
+@app.route('/api/sms-campaigns/<campaign_id>', methods=['GET'])
+def sms_campaign_status(campaign_id):
+    """
+    Report progress of a background SMS campaign.
+    
+    Query parameters:
+        offset (int): index of the first recipient result to return (default 0)
+        limit (int): number of recipient results to return (default 50, max 500)
+    """
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+    except ValueError:
+        return jsonify({
+            "status": "error",
+            "error": "'offset' and 'limit' must be integers"
+        }), 400
+    
+    progress = sms_campaign_store.progress(campaign_id, offset=offset, limit=limit)
+    if progress is None:
+        return jsonify({"status": "error", "error": "Campaign not found"}), 404
+    return jsonify({"status": "success", **progress})
+
+
 @app.route('/api/sms-status', methods=['GET'])
 def sms_status():
     """
     Check if SMS service is configured and available.
     """
+    twilio_client = get_twilio_client()
     return jsonify({
         "status": "success",
         "sms_configured": twilio_client is not None,
@@ -583,6 +1925,8 @@ def sms_status():
 
 
 if __name__ == '__main__':
+    log_startup_status()
+    start_background_workers()
     # Get the port from the environment, defaulting to 5000 for local development.
     port = int(os.environ.get("PORT", 5000))
     # Run the Flask app in debug mode.
@@ -0,0 +1,278 @@
+"""
+Async (ASGI) serving mode.
+
+The slow, I/O-bound routes - /api/chat and /api/generate-image - are served by
+coroutines that call HuggingFace and Pollinations through aiohttp, so one process
+can keep hundreds of upstream requests in flight. Every other route, and the
+frontend, is handed to the Flask app unchanged through asgiref's WsgiToAsgi.
+Caches, the circuit breaker and the manual responder are shared with app.py.
+
+Run with:
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+import urllib.parse
+import uuid
+
+import aiohttp
+from asgiref.wsgi import WsgiToAsgi
+
+import app as flask_app
+from image_variants import (TRANSCODING_AVAILABLE, InvalidVariantOptions, parse_variant_options, transcode,
+                            variant_extension, variant_key, variant_mimetype)
+from singleflight import AsyncSingleFlight
+from upstream import AsyncUpstreamClient, UpstreamStatusError
+
+ASGI_UPSTREAM_POOL_SIZE = int(os.getenv("ASGI_UPSTREAM_POOL_SIZE", 200))
+
+logger = logging.getLogger(__name__)
+
+
+def _async_client_like(client):
+    connect_timeout, read_timeout = client.timeout
+    return AsyncUpstreamClient(
+        client.name,
+        pool_size=ASGI_UPSTREAM_POOL_SIZE,
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        retries=client.retries,
+        latency=client.latency,
+        max_concurrency=client.max_concurrency
+    )
+
+
+huggingface_client = _async_client_like(flask_app.huggingface_client)
+pollinations_client = _async_client_like(flask_app.pollinations_client)
+chat_flight = AsyncSingleFlight()
+image_flight = AsyncSingleFlight()
+
+wsgi_application = WsgiToAsgi(flask_app.app)
+
+
+def _json(status, payload, headers=None):
+    return status, {'Content-Type': 'application/json', **(headers or {})}, json.dumps(payload).encode('utf-8')
+
+
+def _manual_response(user_message, reason):
+    manual = flask_app.select_manual_response(user_message)
+    flask_app.manual_responses.inc(reason, manual.intent)
+    return 200, {
+        'Content-Type': 'application/json',
+        'ETag': f'"{manual.etag}"',
+        'Cache-Control': f'public, max-age={flask_app.MANUAL_RESPONSE_MAX_AGE}',
+        'X-Response-Source': 'manual'
+    }, manual.body
+
+
+async def _query_and_cache_chat(user_message, cache_key):
+    ai_response = flask_app.chat_cache.get(cache_key, count=False)
+    if ai_response is not None:
+        return ai_response
+    breaker = flask_app.huggingface_breaker
+    if not breaker.allow():
+        logger.info("HuggingFace circuit open, falling back to manual responses")
+        return None
+    api_url, headers, payload = flask_app.build_huggingface_request(user_message)
+    try:
+        response = await huggingface_client.post(api_url, headers=headers, json=payload)
+    except Exception:
+        breaker.record_failure()
+        raise
+    # Records the outcome of a call that got a response, once its body is parsed
+    ai_response = flask_app.handle_huggingface_response(response, user_message)
+    if ai_response is not None:
+        ai_response = flask_app.add_chat_context(user_message, ai_response)
+        flask_app.chat_cache.put(cache_key, ai_response)
+    return ai_response
+
+
+async def chat(scope, body):
+    """Async version of app.chat()."""
+    try:
+        data = json.loads(body or b'{}')
+        user_message = str(data.get('message', '')).strip()
+    except (ValueError, AttributeError):
+        return _json(500, {"error": "Internal server error"})
+
+    if not user_message:
+        return _json(400, {"error": "No message provided"})
+
+    backend = flask_app.chat_backend
+    if not backend.configured():
+        return _manual_response(user_message, backend.unconfigured_reason)
+
+    cache_key = flask_app.chat_cache_key(user_message)
+    ai_response = flask_app.chat_cache.get(cache_key)
+    if ai_response is None:
+        try:
+            if backend.name == 'huggingface':
+                ai_response, _ = await chat_flight.do(cache_key, _query_and_cache_chat, user_message, cache_key)
+            else:
+                # In-process backends batch on their own worker thread; just wait for it off the loop
+                ai_response = await asyncio.to_thread(flask_app.get_chat_reply, user_message)
+        except asyncio.TimeoutError:
+            logger.warning("HuggingFace API timeout, falling back to manual responses")
+            return _manual_response(user_message, 'timeout')
+        except Exception as e:
+            logger.warning("HuggingFace API error: %s, falling back to manual responses", e)
+            return _manual_response(user_message, 'upstream_error')
+
+    if ai_response is None:
+        return _manual_response(user_message, 'no_reply')
+    return _json(200, {"response": ai_response})
+
+
+async def _fetch_and_cache_image(params, cache_key):
+    image_url = flask_app.build_pollinations_url(params)
+    logger.debug("Generating image with URL: %s", image_url)
+    response = await pollinations_client.get(image_url, headers=flask_app.POLLINATIONS_HEADERS)
+    response.raise_for_status()
+    image_bytes = response.content
+    await asyncio.to_thread(flask_app.image_cache.put, cache_key, image_bytes)
+    return image_bytes
+
+
+async def _load_image(params, cache_key):
+    # Disk reads happen off the event loop
+    image_bytes = await asyncio.to_thread(flask_app.image_cache.get, cache_key)
+    if image_bytes is not None:
+        return image_bytes, 'HIT'
+    image_bytes, shared = await image_flight.do(cache_key, _fetch_and_cache_image, params, cache_key)
+    return image_bytes, 'COALESCED' if shared else 'MISS'
+
+
+async def _transcode_and_cache(params, cache_key, variant, key):
+    image_bytes = await asyncio.to_thread(flask_app.image_cache.get, key, False)
+    if image_bytes is None:
+        original, _ = await _load_image(params, cache_key)
+        with flask_app.image_transcode_duration.time(variant.format):
+            image_bytes = await asyncio.wrap_future(
+                flask_app.image_transcode_executor.submit(transcode, original, variant))
+        await asyncio.to_thread(flask_app.image_cache.put, key, image_bytes)
+    return image_bytes
+
+
+async def _load_image_variant(params, cache_key, variant):
+    key = variant_key(cache_key, variant)
+    image_bytes = await asyncio.to_thread(flask_app.image_cache.get, key)
+    if image_bytes is not None:
+        return image_bytes, 'HIT'
+    image_bytes, shared = await image_flight.do(key, _transcode_and_cache, params, cache_key, variant, key)
+    return image_bytes, 'COALESCED' if shared else 'MISS'
+
+
+async def generate_image(scope, body):
+    """Async version of app.generate_image() (without the ?stream=1 path)."""
+    try:
+        data = json.loads(body or b'{}')
+        params = flask_app.image_params_from_payload(data)
+        cache_key = flask_app.image_cache_key(params)
+        flask_app.popular_images.record(params, cache_key)
+        query = dict(urllib.parse.parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+        variant = parse_variant_options(query, _header(scope, b'accept'))
+        etag = flask_app.image_etag(cache_key, variant)
+        vary = {'Vary': 'Accept'} if TRANSCODING_AVAILABLE else {}
+
+        if_none_match = _header(scope, b'if-none-match')
+        if if_none_match and (if_none_match.strip() == '*' or f'"{etag}"' in if_none_match):
+            return 304, {'ETag': f'"{etag}"', **vary}, b''
+
+        if variant is not None:
+            image_bytes, cache_status = await _load_image_variant(params, cache_key, variant)
+        else:
+            image_bytes, cache_status = await _load_image(params, cache_key)
+
+        flask_app.image_response_bytes.observe(len(image_bytes), cache_status)
+        extension = variant_extension(variant) if variant is not None else 'jpg'
+        return 200, {
+            'Content-Type': variant_mimetype(variant) if variant is not None else 'image/jpeg',
+            'Content-Disposition': f'attachment; filename=generated_{uuid.uuid4().hex}.{extension}',
+            'ETag': f'"{etag}"',
+            'Cache-Control': f'public, max-age={flask_app.IMAGE_CACHE_MAX_AGE}',
+            'X-Cache': cache_status,
+            **vary
+        }, image_bytes
+
+    except InvalidVariantOptions as e:
+        return _json(400, {"status": "error", "error": str(e), "formats": flask_app.supported_formats()})
+    except (aiohttp.ClientError, asyncio.TimeoutError, UpstreamStatusError) as e:
+        logger.error("Image request error: %s", e)
+        return _json(500, {
+            "status": "error",
+            "error": "Failed to generate image",
+            "details": str(e)
+        })
+    except Exception as e:
+        logger.exception("Unexpected error")
+        return _json(500, {
+            "status": "error",
+            "error": "An unexpected error occurred",
+            "details": str(e)
+        })
+
+
+ASYNC_ROUTES = {
+    ('POST', '/api/chat'): chat,
+    ('POST', '/api/generate-image'): generate_image,
+}
+
+
+def _header(scope, name):
+    for key, value in scope.get('headers', []):
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            flask_app.log_startup_status()
+            flask_app.start_background_workers()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await huggingface_client.close()
+            await pollinations_client.close()
+            await asyncio.to_thread(flask_app.shutdown)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+
+    handler = ASYNC_ROUTES.get((scope.get('method'), scope.get('path'))) if scope['type'] == 'http' else None
+    if handler is None:
+        await wsgi_application(scope, receive, send)
+        return
+
+    started = time.perf_counter()
+    status, headers, body = await handler(scope, await _read_body(receive))
+    # Same series as the Flask routes; the WSGI side records its own
+    flask_app.http_request_duration.observe(time.perf_counter() - started, scope['method'], scope['path'])
+    flask_app.http_requests.inc(scope['method'], scope['path'], status)
+    # Match Flask-CORS, which covers every route on the WSGI side
+    headers.setdefault('Access-Control-Allow-Origin', '*')
+    headers['Content-Length'] = str(len(body))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(key.lower().encode('latin-1'), value.encode('latin-1')) for key, value in headers.items()]
+    })
+    await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,132 @@
+"""
+Load test comparing the sync (threaded WSGI) and async (ASGI) serving modes.
+
+    python -m benchmarks.async_load_test --requests 400 --concurrency 200 --latency 0.5
+
+Both modes run as subprocesses against local stub upstreams that add a fixed
+latency to every HuggingFace and Pollinations call. Each request uses a unique
+message/seed so caches do not hide upstream waits. Prints JSON with throughput
+and latency percentiles per mode and route.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from benchmarks.stub_upstreams import StubConfig, StubServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(host, port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server at {host}:{port} did not start")
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def _drive(base_url, route, total, concurrency):
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(base_url, connector=connector, timeout=aiohttp.ClientTimeout(total=300)) as client:
+        async def one(index):
+            nonlocal errors
+            if route == '/api/chat':
+                payload = {"message": f"benchmark question number {index}"}
+            else:
+                payload = {"prompt": "benchmark", "width": 256, "height": 256, "seed": index}
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    async with client.post(route, json=payload) as response:
+                        await response.read()
+                        if response.status != 200:
+                            errors += 1
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(total)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(total / elapsed, 2),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sync and async serving modes")
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.5, help="seconds added to every upstream call")
+    parser.add_argument('--sync-threads', type=int, default=8)
+    args = parser.parse_args()
+
+    results = {}
+    with StubServer(config=StubConfig(latency=args.latency)) as stub, tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            PYTHONPATH=ROOT,
+            HUGGINGFACE_API_KEY='benchmark',
+            HUGGINGFACE_API_URL=stub.url,
+            POLLINATIONS_BASE_URL=stub.url,
+            IMAGE_CACHE_DIR=os.path.join(tmp, 'images'),
+            SMS_CAMPAIGN_DB=os.path.join(tmp, 'sms.sqlite3'),
+        )
+        for mode in ('sync', 'async'):
+            port = _free_port()
+            command = [sys.executable, '-m', 'benchmarks.serve_modes', mode, '--port', str(port),
+                       '--threads', str(args.sync_threads)]
+            server = subprocess.Popen(command, cwd=ROOT, env=env,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                _wait_for('127.0.0.1', port)
+                results[mode] = {
+                    route: asyncio.run(_drive(base_url, route, args.requests, args.concurrency))
+                    for route in ('/api/chat', '/api/generate-image')
+                }
+            finally:
+                server.terminate()
+                server.wait()
+
+    print(json.dumps({
+        "config": vars(args),
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
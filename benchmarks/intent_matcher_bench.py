@@ -0,0 +1,84 @@
+"""
+Micro-benchmark: the compiled intent matcher against the old linear keyword scan.
+
+    python -m benchmarks.intent_matcher_bench --messages 20000
+
+The legacy scan below reproduces the `any(word in message)` chain that
+get_manual_response used before the intent table. Results differ only where
+the old substring check matched inside words (e.g. 'hi' in 'this').
+"""
+import argparse
+import json
+import random
+import time
+
+from intents import manual_intents
+
+LEGACY_CHAIN = [
+    ("greeting", ['hello', 'hi', 'hey', 'namaste']),
+    ("help", ['help', 'what can you do', 'features']),
+    ("identity", ['name', 'who are you', 'what are you']),
+    ("image", ['image', 'picture', 'generate', 'create', 'draw', 'art']),
+    ("sms", ['sms', 'message', 'text', 'phone']),
+    ("events", ['event', 'hackathon', 'conference']),
+    ("thanks", ['thank', 'thanks', 'appreciate']),
+    ("goodbye", ['bye', 'goodbye', 'exit', 'see you']),
+    ("question", ['how', 'why', 'what', 'when', 'where']),
+    ("creator", ['arun', 'developer', 'creator', 'maker']),
+    ("praise", ['good', 'nice', 'awesome', 'cool', 'amazing']),
+]
+
+SAMPLES = [
+    "hi", "hello there", "Namaste!", "help", "what can you do for me", "who are you", "what is your name",
+    "generate an image of a castle at sunset", "can you draw a dragon", "send an sms to my friend",
+    "any hackathons coming up in Delhi?", "thanks a lot", "bye", "see you later", "how does this work",
+    "where is the conference", "who made you, was it Arun?", "that is awesome", "tell me a story",
+    "I would like to learn about quantum computing and its applications in modern cryptography",
+    "the weather today is pretty mild with a light breeze from the south",
+]
+
+
+def legacy_match(message):
+    lowered = message.lower().strip()
+    for name, words in LEGACY_CHAIN:
+        if any(word in lowered for word in words):
+            return name
+    return None
+
+
+def compiled_match(message):
+    intent = manual_intents.match(message)
+    return intent["name"] if intent else None
+
+
+def _throughput(match, corpus):
+    start = time.perf_counter()
+    for message in corpus:
+        match(message)
+    elapsed = time.perf_counter() - start
+    return {"seconds": round(elapsed, 4), "messages_per_second": round(len(corpus) / elapsed)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare intent matching throughput")
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [rng.choice(SAMPLES) for _ in range(args.messages)]
+
+    legacy = _throughput(legacy_match, corpus)
+    compiled = _throughput(compiled_match, corpus)
+    disagreements = sorted({m for m in SAMPLES if legacy_match(m) != compiled_match(m)})
+    print(json.dumps({
+        "messages": len(corpus),
+        "legacy": legacy,
+        "compiled": compiled,
+        "speedup": round(compiled["messages_per_second"] / legacy["messages_per_second"], 2),
+        "disagreements": disagreements,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""
+Reproducible load benchmark for the main endpoints, fully offline.
+
+    python -m benchmarks.load_suite --requests 500 --concurrency 32 --output results.json
+    python -m benchmarks.load_suite --scenarios chat image --error-rate 0.05 --image-latency 2
+
+The app runs as a subprocess (see serve_modes) against three local stub
+servers standing in for HuggingFace, Pollinations and Twilio, each with its
+own latency, payload size and seeded error rate; the real twilio library is
+pointed at its stub with TWILIO_API_URL. Scenarios run one after another at a
+fixed concurrency:
+
+    chat     POST /api/chat
+    image    POST /api/generate-image
+    sms      POST /api/send-sms-bulk (--sms-recipients numbers per request)
+    events   GET  /api/events with location/date filters
+
+Admission limits and SMS pacing are lifted so the numbers show the server's
+own capacity (pass --admission to keep the configured limits). Payloads are
+unique per request unless --distinct caps them, which lets caches hit.
+
+The report is JSON: throughput, p50/p95/p99/max latency and status codes per
+scenario, plus the server's peak RSS, alongside the config, git commit and
+host details needed to compare runs.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import aiohttp
+
+from benchmarks.async_load_test import _free_port, _percentile, _wait_for
+from benchmarks.stub_upstreams import StubConfig, StubServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = ('chat', 'image', 'sms', 'events')
+EVENT_LOCATIONS = ('Bangalore', 'Delhi', 'Hyderabad', 'Mumbai')
+ADMISSION_CLASSES = ('IMAGE', 'CHAT', 'SMS', 'DEFAULT')
+
+
+def _request(scenario, index, args):
+    """(method, path, json payload) for the index-th request of a scenario."""
+    key = index % args.distinct if args.distinct else index
+    if scenario == 'chat':
+        return 'POST', '/api/chat', {"message": f"benchmark question number {key}"}
+    if scenario == 'image':
+        return 'POST', '/api/generate-image', {"prompt": "benchmark", "width": 256, "height": 256, "seed": key}
+    if scenario == 'sms':
+        numbers = [f"+1555{key % 1000:03d}{n:04d}" for n in range(args.sms_recipients)]
+        return 'POST', '/api/send-sms-bulk', {"to": numbers, "message": f"benchmark message {key}"}
+    location = EVENT_LOCATIONS[key % len(EVENT_LOCATIONS)]
+    return 'GET', f'/api/events?location={location}&from=2025-01-01&limit=20', None
+
+
+async def _drive(base_url, scenario, args):
+    latencies = []
+    statuses = Counter()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+
+    async with aiohttp.ClientSession(base_url, connector=connector, timeout=aiohttp.ClientTimeout(total=300)) as client:
+        async def one(index):
+            method, path, payload = _request(scenario, index, args)
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    async with client.request(method, path, json=payload) as response:
+                        await response.read()
+                        statuses[str(response.status)] += 1
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    statuses[type(e).__name__] += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(args.requests)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests": args.requests,
+        "errors": args.requests - statuses.get('200', 0),
+        "status_codes": dict(sorted(statuses.items())),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(args.requests / elapsed, 2),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 1),
+        "max_ms": round(max(latencies) * 1000, 1),
+    }
+
+
+def _memory_mb(pid):
+    """(current RSS, peak RSS) of a process in MiB, from /proc; (None, None) where unavailable."""
+    values = {}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'VmHWM'):
+                    values[key] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return values.get('VmRSS'), values.get('VmHWM')
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                               text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _server_env(args, stubs, tmp):
+    env = dict(
+        os.environ,
+        PYTHONPATH=ROOT,
+        LOG_LEVEL='WARNING',
+        HUGGINGFACE_API_KEY='benchmark',
+        HUGGINGFACE_API_URL=stubs['huggingface'].url,
+        POLLINATIONS_BASE_URL=stubs['pollinations'].url,
+        TWILIO_API_URL=stubs['twilio'].url,
+        TWILIO_ACCOUNT_SID='ACbenchmark',
+        TWILIO_AUTH_TOKEN='benchmark',
+        TWILIO_PHONE_NUMBER='+15550000000',
+        SMS_RATE_PER_SECOND=str(args.sms_rate),
+        IMAGE_CACHE_DIR=os.path.join(tmp, 'images'),
+        SMS_CAMPAIGN_DB=os.path.join(tmp, 'sms.sqlite3'),
+        # Warm fetches between scenarios would add upstream load the report does not show
+        IMAGE_WARM_BUDGET_PER_MINUTE='0',
+        IMAGE_WARM_STATE=os.path.join(tmp, 'popular-images.json'),
+    )
+    if not args.admission:
+        for name in ADMISSION_CLASSES:
+            env[f'ADMISSION_{name}_CONCURRENCY'] = '0'
+            env[f'ADMISSION_{name}_CLIENT_RATE'] = '0'
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the main endpoints against local stub upstreams")
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=300, help="requests per scenario")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--distinct', type=int, default=0,
+                        help="distinct payloads per scenario (0: every request unique, so caches miss)")
+    parser.add_argument('--mode', choices=['sync', 'async'], default='sync')
+    parser.add_argument('--threads', type=int, default=16, help="server threads in sync mode")
+    parser.add_argument('--admission', action='store_true', help="keep the configured admission limits")
+    parser.add_argument('--chat-latency', type=float, default=0.2)
+    parser.add_argument('--image-latency', type=float, default=0.5)
+    parser.add_argument('--twilio-latency', type=float, default=0.05)
+    parser.add_argument('--reply-words', type=int, default=20, help="words added to each stub chat reply")
+    parser.add_argument('--image-bytes', type=int, default=64 * 1024)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of upstream calls that fail")
+    parser.add_argument('--sms-recipients', type=int, default=5)
+    parser.add_argument('--sms-rate', type=float, default=10000, help="SMS_RATE_PER_SECOND for the server")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    stubs = {
+        'huggingface': StubServer(config=StubConfig(latency=args.chat_latency, reply_words=args.reply_words,
+                                                    error_rate=args.error_rate, seed=args.seed)),
+        'pollinations': StubServer(config=StubConfig(latency=args.image_latency, image_bytes=args.image_bytes,
+                                                     error_rate=args.error_rate, seed=args.seed + 1)),
+        'twilio': StubServer(config=StubConfig(latency=args.twilio_latency, error_rate=args.error_rate,
+                                               seed=args.seed + 2)),
+    }
+    results = {}
+    server_memory = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for stub in stubs.values():
+            stub.start()
+        port = _free_port()
+        command = [sys.executable, '-m', 'benchmarks.serve_modes', args.mode, '--port', str(port),
+                   '--threads', str(args.threads)]
+        server = subprocess.Popen(command, cwd=ROOT, env=_server_env(args, stubs, tmp),
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            _wait_for('127.0.0.1', port)
+            server_memory["startup_rss_mb"], _ = _memory_mb(server.pid)
+            for scenario in args.scenarios:
+                results[scenario] = asyncio.run(_drive(base_url, scenario, args))
+                results[scenario]["server_rss_mb"], _ = _memory_mb(server.pid)
+            _, server_memory["peak_rss_mb"] = _memory_mb(server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+            for stub in stubs.values():
+                stub.stop()
+
+    report = {
+        "config": vars(args),
+        "environment": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "server": server_memory,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Local chat backend benchmark: latency and throughput with and without
+dynamic batching.
+
+    python -m benchmarks.local_chat_bench --concurrency 16 --messages 256
+    python -m benchmarks.local_chat_bench --model facebook/blenderbot_small-90M
+
+Without --model it runs offline against a simulated model whose generate()
+costs a fixed overhead plus a smaller per-message amount, the shape of a CPU
+forward pass; with --model it loads the real model (needs transformers and
+torch). Each configuration is reported as JSON with latency percentiles and
+the mean batch size reached.
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from chat_backends import LocalChatBackend
+
+
+def _simulated_model(overhead, per_message):
+    def generate_batch(messages):
+        time.sleep(overhead + per_message * len(messages))
+        return [f"You said: {message}" for message in messages]
+    return generate_batch
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _run(backend, messages, concurrency):
+    latencies = []
+    lock = threading.Lock()
+
+    def ask(message):
+        start = time.perf_counter()
+        backend.reply(message)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(ask, messages))
+    elapsed = time.perf_counter() - start
+    return {
+        "throughput_per_s": round(len(messages) / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 0.5) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 1),
+        "mean_batch_size": backend.batcher.stats()["mean_batch_size"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare local chat latency with and without batching")
+    parser.add_argument('--model', help="real model to load instead of the simulated one")
+    parser.add_argument('--messages', type=int, default=256)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=5)
+    parser.add_argument('--overhead-ms', type=float, default=40, help="simulated cost of one generate() call")
+    parser.add_argument('--per-message-ms', type=float, default=5, help="simulated extra cost per message")
+    args = parser.parse_args()
+
+    generate_batch = None
+    if not args.model:
+        generate_batch = _simulated_model(args.overhead_ms / 1000, args.per_message_ms / 1000)
+    messages = [f"message number {i}" for i in range(args.messages)]
+
+    results = {}
+    for label, batch_size in (('unbatched', 1), ('batched', args.max_batch_size)):
+        backend = LocalChatBackend(args.model or 'simulated', generate_batch=generate_batch,
+                                   max_batch_size=batch_size, max_wait=args.max_wait_ms / 1000)
+        backend.warm_up()
+        try:
+            results[label] = {"max_batch_size": batch_size, **_run(backend, messages, args.concurrency)}
+        finally:
+            backend.close()
+
+    print(json.dumps({"model": args.model or 'simulated', "messages": args.messages,
+                      "concurrency": args.concurrency, "results": results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Start the app in one of the two serving modes, for load tests.
+
+    python -m benchmarks.serve_modes sync --port 8001 --threads 8
+    python -m benchmarks.serve_modes async --port 8002
+
+"sync" runs the Flask WSGI app on a fixed-size thread pool, like a threaded
+production worker; "async" runs asgi.application under uvicorn.
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server that handles at most `threads` requests at once."""
+
+    def __init__(self, host, port, app, threads):
+        super().__init__(host, port, app)
+        self._pool = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the app for benchmarks")
+    parser.add_argument('mode', choices=['sync', 'async'])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    if args.mode == 'sync':
+        from app import app
+        PooledWSGIServer(args.host, args.port, app, args.threads).serve_forever()
+    else:
+        import uvicorn
+        uvicorn.run('asgi:application', host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Cold-start benchmark: how long a fresh process takes to import app.py and
+answer its first request.
+
+    python -m benchmarks.startup_bench --runs 10
+
+Each run is a new interpreter, like a serverless cold start. Reports the
+median import time, first-request time, and the slowest top-level imports
+(from python -X importtime) as JSON.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/api/sms-status')
+assert response.status_code == 200
+done = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "first_request_ms": (done - imported) * 1000}))
+"""
+
+
+def _env(tmp):
+    return dict(
+        os.environ,
+        PYTHONPATH=ROOT,
+        IMAGE_CACHE_DIR=os.path.join(tmp, 'images'),
+        SMS_CAMPAIGN_DB=os.path.join(tmp, 'sms.sqlite3'),
+    )
+
+
+def _slowest_imports(env, limit):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nesting is shown as two spaces per level; keep only app.py's direct imports
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            modules.append((int(cumulative), name.strip()))
+    modules.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in modules[:limit]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app import and first-request time")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    samples = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = _env(tmp)
+        for _ in range(args.runs):
+            output = subprocess.run([sys.executable, '-c', _PROBE], cwd=ROOT, env=env,
+                                    capture_output=True, text=True, check=True).stdout
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+        slowest = _slowest_imports(env, args.top)
+
+    print(json.dumps({
+        "runs": args.runs,
+        "import_ms_median": round(statistics.median(s["import_ms"] for s in samples), 1),
+        "first_request_ms_median": round(statistics.median(s["first_request_ms"] for s in samples), 1),
+        "slowest_imports": slowest,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Local stand-ins for the HuggingFace, Pollinations and Twilio APIs.
+
+Used by the benchmark scripts so runs are repeatable and work offline. Point the
+app at a stub with HUGGINGFACE_API_URL / POLLINATIONS_BASE_URL / TWILIO_API_URL.
+One server answers all three APIs; run one per API to give each its own config.
+"""
+import json
+import random
+import threading
+import time
+import urllib.parse
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubConfig:
+    def __init__(self, latency=0.0, image_bytes=64 * 1024, token_latency=0.0, reply_words=0, error_rate=0.0,
+                 seed=0):
+        # latency: before the response (time to first token when streaming)
+        # token_latency: between streamed chat tokens
+        # reply_words: filler words appended to each chat reply
+        # error_rate: fraction of calls answered with the API's overload error
+        #   (HuggingFace 503 model loading, Pollinations 502, Twilio 429)
+        self.latency = latency
+        self.image_bytes = image_bytes
+        self.token_latency = token_latency
+        self.reply_words = reply_words
+        self.error_rate = error_rate
+        # Seeded so a run injects the same number of errors every time
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def should_fail(self):
+        if self.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between calls
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; avoid Nagle/delayed-ACK stalls
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_token_stream(self, text, token_latency):
+        # Text-generation style server-sent events, one chunk per token
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        tokens = text.split(' ')
+        for index, word in enumerate(tokens):
+            if index:
+                time.sleep(token_latency)
+            last = index == len(tokens) - 1
+            event = {
+                "token": {"id": index, "text": (' ' if index else '') + word, "special": False},
+                "generated_text": text if last else None
+            }
+            data = f"data:{json.dumps(event)}\n\n".encode('utf-8')
+            self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_twilio_message(self, form):
+        # Enough of a Twilio Message resource for twilio-python to build a MessageInstance
+        sid = 'SM' + uuid.uuid4().hex
+        self._send(201, json.dumps({
+            "sid": sid,
+            "status": "queued",
+            "to": form.get('To', [''])[0],
+            "from": form.get('From', [''])[0],
+            "body": form.get('Body', [''])[0],
+            "num_segments": "1",
+            "uri": f"{self.path[:-len('.json')]}/{sid}.json"
+        }).encode('utf-8'), 'application/json')
+
+    def do_POST(self):
+        config = self.server.config
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        time.sleep(config.latency)
+        if self.path.endswith('/Messages.json'):
+            if config.should_fail():
+                self._send(429, json.dumps({"code": 20429, "message": "Too Many Requests", "status": 429}).encode(
+                    'utf-8'), 'application/json')
+                return
+            self._send_twilio_message(urllib.parse.parse_qs(body.decode('utf-8')))
+        elif self.path.startswith('/models/'):
+            if config.should_fail():
+                self._send(503, b'{"error": "Model is currently loading", "estimated_time": 20}', 'application/json')
+                return
+            payload = json.loads(body or b'{}')
+            text = f"stub reply to: {payload.get('inputs', '')}" + ' lorem' * config.reply_words
+            if payload.get('stream'):
+                self._send_token_stream(text, config.token_latency)
+                return
+            self._send(200, json.dumps([{"generated_text": text}]).encode('utf-8'), 'application/json')
+        else:
+            self._send(404, b'{}', 'application/json')
+
+    def do_GET(self):
+        config = self.server.config
+        time.sleep(config.latency)
+        if self.path.startswith('/p/'):
+            if config.should_fail():
+                self._send(502, b'Bad Gateway', 'text/plain')
+                return
+            self._send(200, b'\xff\xd8' + b'\0' * max(config.image_bytes - 2, 0), 'image/jpeg')
+        else:
+            self._send(404, b'', 'text/plain')
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The socketserver default backlog of 5 drops connections under load tests
+    request_queue_size = 1024
+
+
+class StubServer:
+    """Run the stub upstream APIs on a background thread (port 0 picks a free port)."""
+
+    def __init__(self, host='127.0.0.1', port=0, config=None):
+        self.server = _StubHTTPServer((host, port), _StubHandler)
+        self.server.config = config or StubConfig()
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
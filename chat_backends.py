@@ -0,0 +1,321 @@
+"""
+Pluggable chat reply backends.
+
+A backend turns a user message into reply text; the chat routes add the Royal
+Studio context, caching and the manual fallback around it. Two are provided:
+
+- HuggingFaceChatBackend calls the hosted inference API (behind the circuit
+  breaker), which is the default.
+- LocalChatBackend runs a small conversational model on the CPU in-process.
+  Messages arriving within a few milliseconds of each other are grouped by a
+  DynamicBatcher into one generate() call, and a warm-up generation runs at
+  startup so the first real request does not pay for loading the weights.
+
+transformers and torch are optional and imported only when a local model is
+loaded. LocalChatBackend also accepts any generate_batch(messages) -> replies
+callable, so it can run offline without a model (see benchmarks/local_chat_bench.py).
+"""
+import importlib.util
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Checked without importing: torch alone adds seconds to startup
+TRANSFORMERS_AVAILABLE = all(importlib.util.find_spec(name) is not None for name in ('transformers', 'torch'))
+
+WARM_UP_MESSAGE = "Hello!"
+
+
+class ChatBackend:
+    """
+    Interface for chat backends.
+
+    reply() returns the generated text without Royal Studio context, or None
+    when the caller should fall back to manual responses; errors propagate.
+    """
+    name = None
+    # Manual fallback reason recorded when configured() is False
+    unconfigured_reason = 'unconfigured'
+
+    def __init__(self, model, parameters=None):
+        self.model = model
+        self.parameters = dict(parameters or {})
+
+    def configured(self):
+        """False when the backend cannot be used at all (e.g. no API key)."""
+        return True
+
+    def reply(self, user_message):
+        raise NotImplementedError
+
+    def stream(self, user_message):
+        """Yield the reply in fragments; backends without token streaming yield it whole."""
+        text = self.reply(user_message)
+        if text:
+            yield text
+
+    def warm_up(self):
+        pass
+
+    def stats(self):
+        return {"backend": self.name, "model": self.model}
+
+    def close(self):
+        pass
+
+
+class HuggingFaceChatBackend(ChatBackend):
+    """
+    The hosted HuggingFace inference API.
+
+    query(user_message) and stream(user_message) do the HTTP calls and record
+    one outcome per call on the breaker; this adds the breaker check.
+    """
+    name = 'huggingface'
+    unconfigured_reason = 'no_api_key'
+
+    def __init__(self, model, parameters, api_key, query, stream, breaker):
+        super().__init__(model, parameters)
+        self.api_key = api_key
+        self.breaker = breaker
+        self._query = query
+        self._stream = stream
+
+    def configured(self):
+        return bool(self.api_key) and self.api_key != "your_huggingface_api_key_here"
+
+    def reply(self, user_message):
+        if not self.breaker.allow():
+            logger.info("HuggingFace circuit open, falling back to manual responses")
+            return None
+        return self._query(user_message)
+
+    def stream(self, user_message):
+        if not self.breaker.allow():
+            logger.info("HuggingFace circuit open, falling back to manual responses")
+            return
+        yield from self._stream(user_message)
+
+    def stats(self):
+        return {**super().stats(), "breaker": self.breaker.stats()}
+
+
+class BatcherClosed(RuntimeError):
+    """Raised when submitting to a DynamicBatcher that has been closed."""
+
+
+class DynamicBatcher:
+    """
+    Group concurrent calls into batches for fn(items) -> results.
+
+    The first item of a batch waits at most max_wait seconds for company; the
+    batch is sent as soon as it holds max_batch_size items. One worker thread
+    runs the batches, started on first use so it is never created before a
+    pre-forking server forks.
+    """
+
+    def __init__(self, fn, max_batch_size=8, max_wait=0.005, name='batcher', batch_sizes=None):
+        self.fn = fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.name = name
+        self.batch_sizes = batch_sizes
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def submit(self, item):
+        """Queue item and return a Future for its result."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise BatcherClosed(f"{self.name} is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._queue.put((item, future))
+        return future
+
+    def __call__(self, item, timeout=None):
+        return self.submit(item).result(timeout)
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                # Closing; run what we have and let _run see the sentinel next
+                self._queue.put(None)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            # Callers that timed out and cancelled are dropped before the forward pass
+            batch = [(item, future) for item, future in self._collect(first) if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                results = self.fn([item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"{self.name} returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                logger.warning("%s batch of %d failed: %s", self.name, len(batch), e)
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            with self._lock:
+                self.batches += 1
+                self.items += len(batch)
+                self.largest_batch = max(self.largest_batch, len(batch))
+            if self.batch_sizes is not None:
+                self.batch_sizes.observe(len(batch))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "largest_batch": self.largest_batch,
+                "mean_batch_size": round(self.items / self.batches, 2) if self.batches else None,
+                "pending": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000
+            }
+
+    def close(self, timeout=None):
+        """Stop accepting items; queued items are still run before the worker exits."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join(timeout)
+
+
+def load_transformers_generator(model, max_new_tokens=60, max_input_tokens=128, threads=None):
+    """
+    Load model (a hub name or a local directory) and return generate_batch(messages) -> replies.
+
+    Encoder-decoder models (BlenderBot, T5) and decoder-only models are both
+    supported. Decoding is greedy, so a message always gets the same reply and
+    cached replies match fresh ones.
+    """
+    import torch
+    from transformers import AutoConfig, AutoModelForCausalLM, AutoModelForSeq2SeqLM, AutoTokenizer
+
+    if threads:
+        torch.set_num_threads(threads)
+    config = AutoConfig.from_pretrained(model)
+    tokenizer = AutoTokenizer.from_pretrained(model)
+    encoder_decoder = bool(config.is_encoder_decoder)
+    if encoder_decoder:
+        network = AutoModelForSeq2SeqLM.from_pretrained(model)
+    else:
+        network = AutoModelForCausalLM.from_pretrained(model)
+        # Batched decoder-only generation needs the prompts aligned on the right
+        tokenizer.padding_side = 'left'
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+    network.eval()
+
+    def generate_batch(messages):
+        inputs = tokenizer(list(messages), return_tensors='pt', padding=True, truncation=True,
+                           max_length=max_input_tokens)
+        with torch.inference_mode():
+            output = network.generate(**inputs, max_new_tokens=max_new_tokens, do_sample=False,
+                                      pad_token_id=tokenizer.pad_token_id)
+        if not encoder_decoder:
+            output = output[:, inputs['input_ids'].shape[1]:]
+        return [text.strip() for text in tokenizer.batch_decode(output, skip_special_tokens=True)]
+
+    return generate_batch
+
+
+class LocalChatBackend(ChatBackend):
+    """
+    A conversational model run in-process on the CPU, with dynamic batching.
+
+    generate_batch defaults to load_transformers_generator(model, ...), loaded
+    on warm_up() or the first message.
+    """
+    name = 'local'
+    unconfigured_reason = 'no_model'
+
+    def __init__(self, model, generate_batch=None, max_new_tokens=60, max_input_tokens=128, threads=None,
+                 max_batch_size=8, max_wait=0.005, timeout=30, batch_sizes=None):
+        super().__init__(model, {"max_new_tokens": max_new_tokens, "max_input_tokens": max_input_tokens,
+                                 "do_sample": False})
+        self.threads = threads
+        self.timeout = timeout
+        self.warm_up_seconds = None
+        self._generate_batch = generate_batch
+        self._load_lock = threading.Lock()
+        self.batcher = DynamicBatcher(self._run_batch, max_batch_size=max_batch_size, max_wait=max_wait,
+                                      name='local-chat', batch_sizes=batch_sizes)
+
+    def configured(self):
+        return self._generate_batch is not None or TRANSFORMERS_AVAILABLE
+
+    def _generator(self):
+        if self._generate_batch is None:
+            with self._load_lock:
+                if self._generate_batch is None:
+                    if not TRANSFORMERS_AVAILABLE:
+                        raise RuntimeError("the local chat backend needs transformers and torch installed")
+                    started = time.perf_counter()
+                    self._generate_batch = load_transformers_generator(
+                        self.model,
+                        max_new_tokens=self.parameters["max_new_tokens"],
+                        max_input_tokens=self.parameters["max_input_tokens"],
+                        threads=self.threads
+                    )
+                    logger.info("Loaded local chat model %s in %.1fs", self.model, time.perf_counter() - started)
+        return self._generate_batch
+
+    def _run_batch(self, messages):
+        return self._generator()(messages)
+
+    def reply(self, user_message):
+        future = self.batcher.submit(user_message)
+        try:
+            text = future.result(self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+        if not text or text == user_message:
+            return None
+        return text
+
+    def warm_up(self):
+        """Load the model and run one generation so later requests see steady-state latency."""
+        started = time.perf_counter()
+        self.batcher(WARM_UP_MESSAGE, timeout=None)
+        self.warm_up_seconds = time.perf_counter() - started
+        logger.info("Local chat backend warmed up in %.1fs", self.warm_up_seconds)
+
+    def stats(self):
+        return {**super().stats(), "warm_up_seconds": self.warm_up_seconds, "batcher": self.batcher.stats()}
+
+    def close(self):
+        self.batcher.close(timeout=self.timeout)
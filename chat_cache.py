@@ -0,0 +1,65 @@
+"""
+TTL + LRU cache for chat completions.
+
+Short repeated messages ("hi", "help", "who are you") make up much of the chat
+traffic; caching their upstream completions for a while saves HuggingFace calls.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_chat_message(message):
+    """Lowercase and collapse whitespace so trivially different messages share an entry."""
+    return ' '.join(message.lower().split())
+
+
+class TTLCache:
+    """Bounded LRU whose entries also expire ttl_seconds after being stored."""
+
+    def __init__(self, max_entries=1024, ttl_seconds=600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, count=True):
+        """Return the live value for key or None; count=False skips the hit/miss counters (for re-checks)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += count
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += count
+                return None
+            self._entries.move_to_end(key)
+            self.hits += count
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,103 @@
+"""
+Circuit breaker for flaky upstream services.
+
+After failure_threshold consecutive failures the breaker opens and callers skip
+the upstream entirely for reset_timeout seconds. It then goes half-open and lets
+a few probe calls through: a successful probe closes it again, a failed one
+re-opens it for another cool-down.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, half_open_max_calls=1, history_size=20):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self._transitions = deque(maxlen=history_size)
+        self.short_circuited = 0
+        self.total_failures = 0
+        self.total_successes = 0
+
+    def _transition(self, state, reason):
+        if state == self._state:
+            return
+        self._transitions.append({"at": time.time(), "from": self._state, "to": state, "reason": reason})
+        logger.warning("Circuit breaker '%s': %s -> %s (%s)", self.name, self._state, state, reason)
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state != HALF_OPEN:
+            self._probes = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._transition(HALF_OPEN, "cool-down elapsed")
+
+    def allow(self):
+        """Return True if a call may go to the upstream; every allowed call must be recorded."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.total_successes += 1
+            self._failures = 0
+            if self._state == HALF_OPEN:
+                self._transition(CLOSED, "probe succeeded")
+
+    def record_failure(self):
+        with self._lock:
+            self.total_failures += 1
+            self._failures += 1
+            if self._state == HALF_OPEN:
+                self._transition(OPEN, "probe failed")
+            elif self._state == CLOSED and self._failures >= self.failure_threshold:
+                self._transition(OPEN, f"{self._failures} consecutive failures")
+
+    def stats(self):
+        with self._lock:
+            self._maybe_half_open()
+            retry_in = 0.0
+            if self._state == OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            return {
+                "name": self.name,
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout": self.reset_timeout,
+                "retry_in_seconds": round(retry_in, 3),
+                "short_circuited": self.short_circuited,
+                "failures": self.total_failures,
+                "successes": self.total_successes,
+                "transitions": list(self._transitions),
+            }
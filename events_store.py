@@ -0,0 +1,211 @@
+"""
+Indexed, hot-reloadable event catalog.
+
+Events are kept sorted by (date, id) in an immutable EventCatalog with indexes
+by id and by location, so location and date-range filters are dict lookups and
+binary searches instead of scans. Pagination cursors encode the (date, id) of
+the last event returned, so they stay valid across reloads.
+
+EventStore optionally loads the catalog from a JSON or CSV file and reloads it
+when the file's mtime changes (checked at most every reload_interval seconds,
+on access, so there is no background thread). Serialized responses are cached
+per catalog version and carry an ETag derived from the catalog contents.
+"""
+import base64
+import bisect
+import csv
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ('id', 'title', 'date')
+
+
+class InvalidQuery(ValueError):
+    """Raised for malformed filter, cursor or limit parameters."""
+
+
+def _normalize_event(raw):
+    if not isinstance(raw, dict):
+        raise ValueError("expected an object")
+    missing = [field for field in REQUIRED_FIELDS if not raw.get(field)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    event = dict(raw)
+    event_id = str(event['id']).strip()
+    event['id'] = int(event_id) if event_id.isdigit() else event_id
+    event['date'] = date.fromisoformat(str(event['date']).strip()).isoformat()
+    event['location'] = str(event.get('location') or '').strip()
+    return event
+
+
+def parse_date(value, name):
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise InvalidQuery(f"'{name}' must be a date in YYYY-MM-DD format")
+
+
+def encode_cursor(event):
+    return base64.urlsafe_b64encode(json.dumps([event['date'], str(event['id'])]).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        event_date, event_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(event_date), str(event_id)
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidQuery("'cursor' is not valid")
+
+
+class EventCatalog:
+    """An immutable, indexed snapshot of the events."""
+
+    def __init__(self, events, modified_at=None, cache_size=256):
+        valid = []
+        for raw in events:
+            try:
+                valid.append(_normalize_event(raw))
+            except (ValueError, TypeError) as e:
+                logger.warning("Skipping invalid event %r: %s", raw.get('id') if isinstance(raw, dict) else raw, e)
+        self.events = sorted(valid, key=lambda event: (event['date'], str(event['id'])))
+        self.keys = [(event['date'], str(event['id'])) for event in self.events]
+        self.dates = [event['date'] for event in self.events]
+        self.by_id = {str(event['id']): event for event in self.events}
+        self.by_location = {}
+        for position, event in enumerate(self.events):
+            self.by_location.setdefault(event['location'].lower(), []).append(position)
+
+        encoded = json.dumps(self.events, sort_keys=True).encode('utf-8')
+        self.version = hashlib.sha1(encoded).hexdigest()
+        self.modified_at = modified_at if modified_at is not None else time.time()
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.events)
+
+    def get(self, event_id):
+        return self.by_id.get(str(event_id))
+
+    def query(self, locations=None, start=None, end=None, cursor=None, limit=None):
+        """
+        Return (events, next_cursor) for the filters, in (date, id) order.
+
+        locations is a list of location names (case-insensitive), start and end
+        are inclusive ISO dates, cursor comes from a previous page.
+        """
+        low = bisect.bisect_left(self.dates, start) if start else 0
+        high = bisect.bisect_right(self.dates, end) if end else len(self.events)
+        if cursor:
+            low = max(low, bisect.bisect_right(self.keys, decode_cursor(cursor)))
+
+        if locations:
+            positions = sorted({
+                position
+                for location in locations
+                for position in self.by_location.get(location.lower(), ())
+            })
+            selected = positions[bisect.bisect_left(positions, low):bisect.bisect_left(positions, high)]
+        else:
+            selected = range(low, max(low, high))
+
+        page = selected if limit is None else selected[:limit]
+        events = [self.events[position] for position in page]
+        next_cursor = encode_cursor(events[-1]) if limit is not None and len(selected) > limit else None
+        return events, next_cursor
+
+    def cached(self, key, build):
+        """Return build() for key, memoized for the lifetime of this catalog."""
+        with self._lock:
+            value = self._cache.get(key)
+            if value is not None:
+                self._cache.move_to_end(key)
+                return value
+        value = build()
+        with self._lock:
+            self._cache[key] = value
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return value
+
+
+def load_events_file(path):
+    """Read events from a .json file (a list, or {"events": [...]}) or a .csv file with a header row."""
+    if path.lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('events', [])
+    if not isinstance(data, list):
+        raise ValueError("expected a list of events")
+    return data
+
+
+class EventStore:
+    """Holds the current EventCatalog, reloading it from path when the file changes."""
+
+    def __init__(self, events=(), path=None, reload_interval=5.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.reloads = 0
+        self.reload_errors = 0
+        self._lock = threading.Lock()
+        self._signature = None
+        self._checked_at = 0.0
+        self._catalog = EventCatalog(events)
+        if path:
+            self.reload(force=True)
+
+    @property
+    def catalog(self):
+        if self.path and time.monotonic() - self._checked_at >= self.reload_interval:
+            self.reload()
+        return self._catalog
+
+    def reload(self, force=False):
+        """Reload from path if its mtime changed; a broken file keeps the previous catalog."""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                stat = os.stat(self.path)
+            except OSError as e:
+                if self._signature is not None or force:
+                    logger.warning("Events file %s is unavailable: %s", self.path, e)
+                return False
+            # Size as well as mtime, in case a rewrite lands within the mtime resolution
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if signature == self._signature and not force:
+                return False
+            try:
+                catalog = EventCatalog(load_events_file(self.path), modified_at=stat.st_mtime)
+            except (OSError, ValueError) as e:
+                self.reload_errors += 1
+                logger.warning("Failed to reload events from %s: %s", self.path, e)
+                return False
+            self._catalog = catalog
+            self._signature = signature
+            self.reloads += 1
+            logger.info("Loaded %d events from %s", len(catalog), self.path)
+            return True
+
+    def stats(self):
+        catalog = self._catalog
+        return {
+            "events": len(catalog),
+            "version": catalog.version,
+            "modified_at": catalog.modified_at,
+            "path": self.path,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+        }
@@ -50,9 +50,25 @@ const Index = () => {
     setChatMessage("");
     setIsLoading(true);
 
+    const botMessageId = (Date.now() + 1).toString();
+    const addBotMessage = (text: string) => {
+      setChatMessages(prev => [...prev, {
+        id: botMessageId,
+        text,
+        sender: 'bot',
+        timestamp: new Date()
+      }]);
+    };
+    const setBotMessageText = (update: (text: string) => string) => {
+      setChatMessages(prev => prev.map(message =>
+        message.id === botMessageId ? { ...message, text: update(message.text) } : message
+      ));
+    };
+
     try {
       console.log('Sending message to API:', currentMessage);
-      const response = await fetch('/api/chat', {
+      // Server-sent events: the reply is shown token by token as it is generated
+      const response = await fetch('/api/chat/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -63,25 +79,49 @@ const Index = () => {
       });
       console.log('API Response status:', response.status);
 
-      const data = await response.json();
-      console.log('API Response data:', data);
+      if (!response.ok || !response.body) {
+        const data = await response.json().catch(() => ({}));
+        addBotMessage(data.error || 'Sorry, I encountered an error. Please try again.');
+        return;
+      }
 
-      if (response.ok) {
-        const botMessage: ChatMessage = {
-          id: (Date.now() + 1).toString(),
-          text: data.response,
-          sender: 'bot',
-          timestamp: new Date()
-        };
-        setChatMessages(prev => [...prev, botMessage]);
-      } else {
-        const errorMessage: ChatMessage = {
-          id: (Date.now() + 1).toString(),
-          text: data.error || 'Sorry, I encountered an error. Please try again.',
-          sender: 'bot',
-          timestamp: new Date()
-        };
-        setChatMessages(prev => [...prev, errorMessage]);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let started = false;
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const rawEvent = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          const eventType = rawEvent.match(/^event: (.*)$/m)?.[1];
+          const rawData = rawEvent.match(/^data: (.*)$/m)?.[1];
+          if (!rawData) continue;
+          const data = JSON.parse(rawData);
+
+          if (eventType === 'token') {
+            if (!started) {
+              started = true;
+              setIsLoading(false);
+              addBotMessage(data.text);
+            } else {
+              setBotMessageText(text => text + data.text);
+            }
+          } else if (eventType === 'done') {
+            console.log('Chat reply source:', data.source, 'time to first token:', data.ttft_ms, 'ms');
+            if (started) {
+              setBotMessageText(() => data.response);
+            }
+          }
+        }
+      }
+
+      if (!started) {
+        addBotMessage('Sorry, I encountered an error. Please try again.');
       }
     } catch (error) {
       const errorMessage: ChatMessage = {
@@ -0,0 +1,56 @@
+"""
+Production server settings for gunicorn.
+
+    gunicorn app:app
+
+gunicorn picks this file up automatically from the working directory. Every
+setting can be overridden with the environment variables below.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# gthread workers: requests spend most of their time waiting on HuggingFace,
+# Pollinations or Twilio, so threads go further than one process per request.
+# One process by default: image jobs, admission limits and the SMS rate limit
+# live in the process, so with N workers job polls can land on a worker that
+# does not know the job, and the sender number goes out at N x
+# SMS_RATE_PER_SECOND. Only raise WEB_CONCURRENCY with sticky routing and
+# per-worker limits sized accordingly.
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+threads = int(os.getenv('GUNICORN_THREADS', 32))
+
+# Import the app once in the master and fork workers from it, so imports are
+# paid once and pages are shared copy-on-write. Background threads are started
+# per worker in post_fork, never in the master.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Image generation can legitimately take up to the Pollinations read timeout
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 150))
+# Time allowed for in-flight requests and image jobs to finish on SIGTERM
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 120))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers periodically to bound memory growth from caches
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', None)
+errorlog = '-'
+
+
+def when_ready(server):
+    import app
+    app.log_startup_status()
+
+
+def post_fork(server, worker):
+    # Only starts threads: anything slow here counts against the worker timeout
+    import app
+    app.start_background_workers()
+
+
+def worker_exit(server, worker):
+    import app
+    app.shutdown(timeout=graceful_timeout)
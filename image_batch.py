@@ -0,0 +1,66 @@
+"""
+Helpers for generating several images in one request.
+
+run_batch() fans the work out on an executor and yields results in completion
+order, so a streamed response can report each image as soon as it is ready
+rather than after the slowest one. ZipStream builds a zip archive on the fly
+for clients that want the images themselves instead of a manifest.
+"""
+import zipfile
+from concurrent.futures import as_completed
+
+
+def run_batch(executor, fn, items):
+    """
+    Call fn(item) for every item on executor and yield (index, result, error).
+
+    Results come in completion order; exactly one of result/error is set. If
+    the consumer stops early (e.g. the client disconnected), items that have
+    not started yet are cancelled.
+    """
+    futures = {executor.submit(fn, item): index for index, item in enumerate(items)}
+    try:
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+class _ChunkSink:
+    # Write-only, unseekable file object; zipfile then writes data descriptors
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ZipStream:
+    """Incrementally built zip archive; each call returns the bytes ready to send."""
+
+    def __init__(self):
+        self._sink = _ChunkSink()
+        # Images are already compressed, so entries are stored as-is
+        self._archive = zipfile.ZipFile(self._sink, 'w', compression=zipfile.ZIP_STORED)
+
+    def add(self, name, data):
+        self._archive.writestr(name, data)
+        return self._sink.drain()
+
+    def close(self):
+        """Finish the archive (central directory) and return the final bytes."""
+        self._archive.close()
+        return self._sink.drain()
@@ -0,0 +1,234 @@
+"""
+Two-tier cache for generated images.
+
+Pollinations output is fully determined by (prompt, width, height, seed, model),
+so images are stored under a hash of those parameters: a small in-memory LRU
+keeps the hottest images, and a size-capped directory on disk keeps the rest.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+def normalize_image_params(prompt, width, height, seed, model):
+    """Return the canonical parameter dict used for both the upstream URL and the cache key."""
+    return {
+        "prompt": str(prompt),
+        "width": str(width),
+        "height": str(height),
+        "seed": str(seed),
+        "model": str(model),
+    }
+
+
+def image_cache_key(params):
+    """Hash normalized image parameters into a stable, filename-safe cache key."""
+    encoded = json.dumps(params, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ImageCache:
+    """
+    Bounded in-memory LRU in front of a size-capped on-disk store.
+
+    Both tiers are limited by total bytes. Disk entries are evicted least
+    recently used first, using file mtime to rebuild the order; the directory is
+    scanned on first use rather than at construction to keep cold starts fast.
+    Files missing from the index are still looked up, so processes sharing the
+    directory hit each other's entries.
+    """
+
+    def __init__(self, directory, max_memory_bytes=64 * 1024 * 1024, max_disk_bytes=1024 * 1024 * 1024):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._load_disk_index()
+            self._loaded = True
+
+    def _load_disk_index(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith('.') or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._disk[name] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key, count=True):
+        """
+        Return cached bytes for key, or None on a miss.
+
+        count=False leaves the hit/miss counters alone, for re-checks of a key
+        the caller has already looked up.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                if key in self._disk:
+                    self._disk.move_to_end(key)
+                self.hits += count
+                return data
+
+        # Tried even when not indexed: another process may have written it since the scan
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+        except OSError:
+            data = None
+
+        with self._lock:
+            if data is None:
+                self._disk_bytes -= self._disk.pop(key, 0)
+                self.misses += count
+                return None
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            else:
+                self._disk[key] = len(data)
+                self._disk_bytes += len(data)
+                self._evict_disk()
+            self._remember(key, data)
+            self.hits += count
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        return data
+
+    def __contains__(self, key):
+        self._ensure_loaded()
+        with self._lock:
+            if key in self._memory or key in self._disk:
+                return True
+        return os.path.isfile(self._path(key))
+
+    def put(self, key, data):
+        """Store bytes under key in both tiers."""
+        self._ensure_loaded()
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self._disk_bytes -= self._disk.pop(key, 0)
+            self._disk[key] = len(data)
+            self._disk_bytes += len(data)
+            self._remember(key, data)
+            self._evict_disk()
+
+    def open_writer(self, key):
+        """
+        Return a writer that streams bytes into the disk tier under key.
+
+        Nothing becomes visible until commit(); discard() drops the partial file.
+        """
+        self._ensure_loaded()
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        return _CacheWriter(self, key, os.fdopen(fd, 'wb'), tmp_path)
+
+    def _commit_file(self, key, tmp_path, size):
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self._disk_bytes -= self._disk.pop(key, 0)
+            self._disk[key] = size
+            self._disk_bytes += size
+            self._evict_disk()
+
+    def _remember(self, key, data):
+        if len(data) > self.max_memory_bytes:
+            return
+        self._memory_bytes -= len(self._memory.pop(key, b''))
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _evict_disk(self):
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            name, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                pass
+
+    def stats(self):
+        self._ensure_loaded()
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+            }
+
+
+class _CacheWriter:
+    """Incremental writer for one disk cache entry, see ImageCache.open_writer."""
+
+    def __init__(self, cache, key, file, tmp_path):
+        self._cache = cache
+        self._key = key
+        self._file = file
+        self._tmp_path = tmp_path
+        self.size = 0
+        self.closed = False
+
+    def write(self, chunk):
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._file.close()
+        self._cache._commit_file(self._key, self._tmp_path, self.size)
+
+    def discard(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
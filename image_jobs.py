@@ -0,0 +1,130 @@
+"""
+Background image-generation jobs.
+
+Slow upstream fetches run on a bounded thread pool instead of a request worker.
+Clients get a job id back immediately and either poll the job or wait on its
+state changes (used by the SSE endpoint).
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = 'queued'
+FETCHING = 'fetching'
+DONE = 'done'
+ERROR = 'error'
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already waiting for a worker."""
+
+
+class ImageJob:
+    def __init__(self, cache_key):
+        self.id = uuid.uuid4().hex
+        self.cache_key = cache_key
+        self.state = QUEUED
+        self.error = None
+        self.cache_status = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.version = 0
+
+    @property
+    def finished(self):
+        return self.state in (DONE, ERROR)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "state": self.state,
+            "error": self.error,
+            "cache": self.cache_status,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class ImageJobManager:
+    """Run image fetches on a bounded executor and track their progress."""
+
+    def __init__(self, max_workers=4, max_pending=64, ttl_seconds=3600):
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='image-job')
+        self._jobs = {}
+        self._pending = 0
+        self._changed = threading.Condition()
+
+    def submit(self, cache_key, fn, *args):
+        """
+        Queue fn(*args) and return the new job.
+
+        fn must return (image_bytes, cache_status); only the status is kept on
+        the job, the bytes are expected to live in the image cache.
+        """
+        with self._changed:
+            self._expire()
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(f"{self._pending} image jobs already queued")
+            job = ImageJob(cache_key)
+            self._jobs[job.id] = job
+            self._pending += 1
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def complete(self, cache_key, cache_status):
+        """Record a job that was already satisfied without running (e.g. a cache hit)."""
+        job = ImageJob(cache_key)
+        job.state = DONE
+        job.cache_status = cache_status
+        with self._changed:
+            self._expire()
+            self._jobs[job.id] = job
+        return job
+
+    def _run(self, job, fn, args):
+        with self._changed:
+            self._pending -= 1
+        self._update(job, FETCHING)
+        try:
+            _, cache_status = fn(*args)
+            self._update(job, DONE, cache_status=cache_status)
+        except Exception as e:
+            self._update(job, ERROR, error=str(e))
+
+    def _update(self, job, state, error=None, cache_status=None):
+        with self._changed:
+            job.state = state
+            job.error = error
+            job.cache_status = cache_status
+            job.updated_at = time.time()
+            job.version += 1
+            self._changed.notify_all()
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.updated_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._changed:
+            return self._jobs.get(job_id)
+
+    def wait_for_change(self, job, version, timeout):
+        """Block until job.version differs from version or timeout elapses; return a snapshot."""
+        with self._changed:
+            self._changed.wait_for(lambda: job.version != version, timeout=timeout)
+            return job.version, job.to_dict()
+
+    def stats(self):
+        with self._changed:
+            states = {}
+            for job in self._jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+            return {"pending": self._pending, "jobs": states}
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
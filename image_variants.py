@@ -0,0 +1,153 @@
+"""
+Resized and re-encoded variants of cached images.
+
+A variant is described by an output format (progressive JPEG, WebP or AVIF), a
+maximum side length and an encoder quality. The format comes from ?format= or,
+failing that, from the formats the client lists in its Accept header. Variants
+are cached under a key derived from the original's key, so each one is encoded
+once per cache lifetime.
+
+Pillow is optional: without it no variants are produced and originals are
+served unchanged.
+"""
+from collections import namedtuple
+from io import BytesIO
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+    features = None
+
+# name -> (mimetype, file extension, Pillow format, default quality, encoder options)
+FORMATS = {
+    'jpeg': ('image/jpeg', 'jpg', 'JPEG', 82, {'progressive': True, 'optimize': True}),
+    'webp': ('image/webp', 'webp', 'WEBP', 80, {'method': 4}),
+    'avif': ('image/avif', 'avif', 'AVIF', 60, {'speed': 8}),
+}
+FORMAT_ALIASES = {'jpg': 'jpeg'}
+
+# Accept-based negotiation prefers WebP: it encodes far faster than AVIF
+NEGOTIATION_ORDER = ('webp', 'avif')
+
+MIN_SIDE = 16
+MAX_SIDE = 4096
+
+# Responses may differ by Accept header whenever variants can be produced
+TRANSCODING_AVAILABLE = Image is not None
+
+VariantOptions = namedtuple('VariantOptions', ['format', 'max_side', 'quality'])
+
+
+class InvalidVariantOptions(ValueError):
+    """Raised for unusable ?format=, ?max_side= or ?quality= values."""
+
+
+def _available(name):
+    if Image is None:
+        return False
+    return name == 'jpeg' or bool(features.check(name))
+
+
+def supported_formats():
+    """Names of the output formats this installation can encode."""
+    return [name for name in FORMATS if _available(name)]
+
+
+def _accepted_types(accept):
+    accepted = set()
+    for media_range in (accept or '').split(','):
+        media_type, _, params = media_range.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(media_type.strip().lower())
+    return accepted
+
+
+def negotiate_format(accept):
+    """Pick an output format the client explicitly accepts, or None (wildcards do not count)."""
+    accepted = _accepted_types(accept)
+    for name in NEGOTIATION_ORDER:
+        if FORMATS[name][0] in accepted and _available(name):
+            return name
+    return None
+
+
+def _int_option(args, name, low, high):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise InvalidVariantOptions(f"'{name}' must be an integer")
+    if not low <= number <= high:
+        raise InvalidVariantOptions(f"'{name}' must be between {low} and {high}")
+    return number
+
+
+def parse_variant_options(args, accept=None):
+    """
+    Read variant options from query args and the Accept header.
+
+    Returns None when the original bytes should be served unchanged: no
+    options were given and the client does not list WebP/AVIF, or Pillow is
+    not installed.
+    """
+    if Image is None:
+        return None
+
+    requested = (args.get('format') or '').strip().lower()
+    requested = FORMAT_ALIASES.get(requested, requested)
+    max_side = _int_option(args, 'max_side', MIN_SIDE, MAX_SIDE)
+    quality = _int_option(args, 'quality', 1, 100)
+
+    if requested and requested != 'auto':
+        if requested not in FORMATS:
+            raise InvalidVariantOptions(f"'format' must be one of: auto, {', '.join(FORMATS)}")
+        if not _available(requested):
+            raise InvalidVariantOptions(f"'{requested}' encoding is not supported on this server")
+        output = requested
+    else:
+        output = negotiate_format(accept)
+        if output is None:
+            if max_side is None and quality is None:
+                return None
+            output = 'jpeg'
+
+    return VariantOptions(output, max_side, quality or FORMATS[output][3])
+
+
+def variant_key(cache_key, options):
+    """Cache key for a variant; stored next to the original in the same cache."""
+    extension = FORMATS[options.format][1]
+    return f"{cache_key}.{options.max_side or 'full'}.q{options.quality}.{extension}"
+
+
+def variant_mimetype(options):
+    return FORMATS[options.format][0]
+
+
+def variant_extension(options):
+    return FORMATS[options.format][1]
+
+
+def transcode(image_bytes, options):
+    """Downscale (never upscale) to fit max_side and re-encode; CPU-bound, run it off the request thread."""
+    _, _, pillow_format, _, encoder_options = FORMATS[options.format]
+    with Image.open(BytesIO(image_bytes)) as image:
+        if options.max_side:
+            # thumbnail() lets the JPEG decoder scale down during decode (draft mode) before resampling
+            image.thumbnail((options.max_side, options.max_side), Image.Resampling.LANCZOS)
+        if image.mode not in ('RGB', 'L') and options.format == 'jpeg':
+            image = image.convert('RGB')
+        output = BytesIO()
+        image.save(output, pillow_format, quality=options.quality, **encoder_options)
+    return output.getvalue()
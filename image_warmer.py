@@ -0,0 +1,363 @@
+"""
+Popular-image tracking and background cache warming.
+
+Most image requests repeat a few hundred popular parameter sets, yet each one
+still waits for Pollinations on the first request after an eviction or a
+deploy. PopularImages counts every request in a count-min sketch (fixed
+memory, however many distinct prompts arrive) and keeps the top_k most
+requested parameter sets. Counts are halved periodically so the list follows
+what is popular now rather than what was popular last month.
+
+CacheWarmer is a low-priority background thread that fetches the popular
+images missing from the cache, but only while the image routes have been quiet
+for a while, and at most budget_per_minute upstream fetches. The list is saved
+to a JSON file periodically and on shutdown and loaded at startup, so a fresh
+process starts warming straight away. Processes sharing the file each write
+their own section of it, and a new process starts from all of them.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: saves are still atomic, only concurrent writers may drop each other's section
+    fcntl = None
+
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+
+
+@contextmanager
+def _file_lock(path):
+    if fcntl is None:
+        yield
+        return
+    with open(path + '.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _read_state(path):
+    """{writer: section} from a state file, or None if it is missing or unreadable."""
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable popular image list %s: %s", path, e)
+        return None
+    if (not isinstance(state, dict) or state.get("version") != STATE_VERSION
+            or not isinstance(state.get("writers"), dict)):
+        logger.warning("Ignoring popular image list %s with unknown format", path)
+        return None
+    return {writer: section for writer, section in state["writers"].items() if isinstance(section, dict)}
+
+
+def _write_state(path, writers):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump({"version": STATE_VERSION, "writers": writers}, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class CountMinSketch:
+    """
+    Approximate counts for hex digest keys (e.g. image cache keys) in width * depth counters.
+
+    Estimates never undercount; with conservative updates they overcount only
+    when every row collides with heavier keys.
+    """
+
+    def __init__(self, width=4096, depth=4):
+        if depth * 8 > 64:
+            raise ValueError("depth must be at most 8 for 256-bit keys")
+        self.width = width
+        self.depth = depth
+        self._rows = [[0] * width for _ in range(depth)]
+
+    def _cells(self, key):
+        # The keys are already uniform hashes, so each row takes its index from a different slice
+        return [int(key[row * 8:row * 8 + 8], 16) % self.width for row in range(self.depth)]
+
+    def add(self, key, count=1):
+        """Add count to key and return its new estimate."""
+        cells = self._cells(key)
+        estimate = min(row[cell] for row, cell in zip(self._rows, cells)) + count
+        for row, cell in zip(self._rows, cells):
+            # Conservative update: only raise counters that are below the new estimate
+            if row[cell] < estimate:
+                row[cell] = estimate
+        return estimate
+
+    def estimate(self, key):
+        return min(row[cell] for row, cell in zip(self._rows, self._cells(key)))
+
+    def halve(self):
+        for row in self._rows:
+            row[:] = [value >> 1 for value in row]
+
+
+class PopularImages:
+    """
+    Request frequencies for image parameters and the top_k most requested sets.
+
+    Every decay_every records (default 10 * width) all counts are halved.
+    """
+
+    def __init__(self, top_k=200, width=4096, depth=4, decay_every=None):
+        self.top_k = top_k
+        self.decay_every = decay_every or 10 * width
+        # This process's section in a shared state file
+        self.writer = uuid.uuid4().hex
+        self.sketch = CountMinSketch(width, depth)
+        self.recorded = 0
+        self.last_recorded = None
+        # cache key -> [estimated count, params]
+        self._top = {}
+        # Lower bound on the smallest count in a full top list; only a larger estimate can get in
+        self._floor = 0
+        self._since_decay = 0
+        self._lock = threading.Lock()
+
+    def record(self, params, cache_key, count=1):
+        with self._lock:
+            self.recorded += 1
+            self.last_recorded = time.monotonic()
+            estimate = self.sketch.add(cache_key, count)
+            self._offer(cache_key, params, estimate)
+            self._since_decay += 1
+            if self._since_decay >= self.decay_every:
+                self._decay()
+
+    def _offer(self, cache_key, params, estimate):
+        entry = self._top.get(cache_key)
+        if entry is not None:
+            entry[0] = estimate
+            return
+        if len(self._top) < self.top_k:
+            self._top[cache_key] = [estimate, params]
+        elif estimate > self._floor:
+            # The floor only lags behind (tracked counts keep growing), so check the real coldest entry
+            coldest = min(self._top, key=lambda key: self._top[key][0])
+            if estimate > self._top[coldest][0]:
+                del self._top[coldest]
+                self._top[cache_key] = [estimate, params]
+        else:
+            return
+        if len(self._top) >= self.top_k:
+            self._floor = min(count for count, _ in self._top.values())
+
+    def _decay(self):
+        self.sketch.halve()
+        for key in list(self._top):
+            entry = self._top[key]
+            entry[0] >>= 1
+            if entry[0] == 0:
+                del self._top[key]
+        self._floor = min((count for count, _ in self._top.values()), default=0)
+        self._since_decay = 0
+
+    def top(self, limit=None, min_count=1):
+        """[(count, cache_key, params)] for the most requested parameter sets, most requested first."""
+        with self._lock:
+            entries = [(count, key, params) for key, (count, params) in self._top.items() if count >= min_count]
+        entries.sort(key=lambda entry: entry[0], reverse=True)
+        return entries[:limit] if limit is not None else entries
+
+    def __len__(self):
+        return len(self._top)
+
+    def save(self, path, stale_after=3600):
+        """
+        Write the top list to this process's section of the JSON file at path.
+
+        Sections of other processes are kept unless they were last written
+        more than stale_after seconds ago (their process is gone).
+        """
+        entries = [{"count": count, "params": params} for count, _, params in self.top()]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with _file_lock(path):
+            now = time.time()
+            writers = {
+                writer: section for writer, section in (_read_state(path) or {}).items()
+                if writer != self.writer and isinstance(section.get("saved_at"), (int, float))
+                and now - section["saved_at"] < stale_after
+            }
+            writers[self.writer] = {"saved_at": now, "entries": entries}
+            _write_state(path, writers)
+
+    def load(self, path, cache_key):
+        """
+        Seed the counts from a file written by save(); return the number of entries loaded.
+
+        Sections from several processes are merged, keeping the highest count
+        for each parameter set. cache_key(params) recomputes the keys, so a
+        list saved under an older key scheme still lines up with the cache.
+        """
+        merged = {}
+        for section in (_read_state(path) or {}).values():
+            entries = section.get("entries")
+            for entry in entries if isinstance(entries, list) else []:
+                try:
+                    count, params = int(entry["count"]), dict(entry["params"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                key = cache_key(params)
+                if key not in merged or count > merged[key][0]:
+                    merged[key] = (count, params)
+        hottest = sorted(merged.items(), key=lambda item: item[1][0], reverse=True)[:self.top_k]
+        with self._lock:
+            for key, (count, params) in hottest:
+                self._offer(key, params, self.sketch.add(key, max(count, 1)))
+        return len(hottest)
+
+
+class CacheWarmer:
+    """
+    Fetch popular images missing from the cache while the image routes are idle.
+
+    A round runs every interval seconds when busy() is False and nothing was
+    recorded for idle_seconds. It walks the top list (entries requested at
+    least min_count times), skipping cached images, and calls load(params, key)
+    for the rest until the budget runs out or traffic returns. state_path, if
+    given, is loaded by start() and saved every save_interval seconds and by
+    stop().
+    """
+
+    def __init__(self, popular, cache, load, cache_key, busy=lambda: False, budget_per_minute=20,
+                 idle_seconds=5.0, interval=1.0, min_count=2, state_path=None, save_interval=300,
+                 warmed=None):
+        self.popular = popular
+        self.cache = cache
+        self.load = load
+        self.cache_key = cache_key
+        self.busy = busy
+        self.budget_per_minute = budget_per_minute
+        self.idle_seconds = idle_seconds
+        self.interval = interval
+        self.min_count = min_count
+        self.state_path = state_path
+        self.save_interval = save_interval
+        # Optional metrics.Counter labelled (result,)
+        self.warmed_counter = warmed
+        # A single token: fetches are spread evenly instead of bursting after a quiet spell
+        self.budget = TokenBucket(budget_per_minute / 60.0, capacity=1)
+        self.rounds = 0
+        self.warmed = 0
+        self.failed = 0
+        self.last_warmed_at = None
+        self._started_at = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Load the saved list and start the thread once."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            if self.state_path:
+                loaded = self.popular.load(self.state_path, self.cache_key)
+                if loaded:
+                    logger.info("Loaded %d popular image(s) to warm from %s", loaded, self.state_path)
+            self._started_at = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name='image-warmer', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        with self._lock:
+            thread = self._thread
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join(timeout)
+        self.save()
+
+    def save(self):
+        if not self.state_path:
+            return
+        try:
+            # Sections of workers that stopped saving for a few intervals are dropped
+            self.popular.save(self.state_path, stale_after=3 * self.save_interval)
+        except OSError as e:
+            logger.warning("Could not save popular image list to %s: %s", self.state_path, e)
+
+    def _idle(self):
+        last = self.popular.last_recorded or self._started_at
+        return time.monotonic() - last >= self.idle_seconds and not self.busy()
+
+    def _run(self):
+        last_saved = time.monotonic()
+        while not self._stop.wait(self.interval):
+            if self.state_path and time.monotonic() - last_saved >= self.save_interval:
+                self.save()
+                last_saved = time.monotonic()
+            if self._idle():
+                self.run_once()
+
+    def run_once(self):
+        """Warm uncached popular images until the budget is spent or traffic returns; return the number fetched."""
+        self.rounds += 1
+        fetched = 0
+        for _, key, params in self.popular.top(min_count=self.min_count):
+            if self._stop.is_set() or not self._idle():
+                break
+            if key in self.cache:
+                continue
+            if self.budget.try_acquire() > 0:
+                break
+            try:
+                self.load(params, key)
+            except Exception as e:
+                self.failed += 1
+                self._count('failed')
+                logger.warning("Warming image %s failed: %s", key[:12], e)
+                continue
+            self.warmed += 1
+            self.last_warmed_at = time.time()
+            self._count('warmed')
+            fetched += 1
+        return fetched
+
+    def _count(self, result):
+        if self.warmed_counter is not None:
+            self.warmed_counter.inc(result)
+
+    def stats(self):
+        hot = self.popular.top(limit=10, min_count=self.min_count)
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "tracked": len(self.popular),
+            "recorded": self.popular.recorded,
+            "rounds": self.rounds,
+            "warmed": self.warmed,
+            "failed": self.failed,
+            "last_warmed_at": self.last_warmed_at,
+            "budget_per_minute": self.budget_per_minute,
+            "idle_seconds": self.idle_seconds,
+            "state_path": self.state_path,
+            "top": [{"count": count, "prompt": params.get("prompt"), "cached": key in self.cache}
+                    for count, key, params in hot]
+        }
@@ -0,0 +1,222 @@
+"""
+Keyword intent tables for the chat responders.
+
+Each table is an ordered list of intents (highest priority first). A table is
+compiled once into a keyword index: the message is split into words in a single
+regex pass and each word is looked up in a dict (multi-word phrases are keyed by
+their first word), so keywords only match whole words. When several intents
+appear in a message, the one listed first wins.
+"""
+import hashlib
+import json
+import re
+import zlib
+from collections import namedtuple
+from functools import lru_cache
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class IntentMatcher:
+    def __init__(self, intents):
+        self.intents = intents
+        # word -> best priority, and first word -> [(remaining words, priority)] for phrases
+        self._words = {}
+        self._phrases = {}
+        for priority, intent in enumerate(intents):
+            for keyword in intent["keywords"]:
+                words = tuple(_WORD.findall(keyword.lower()))
+                if len(words) == 1:
+                    self._words.setdefault(words[0], priority)
+                else:
+                    self._phrases.setdefault(words[0], []).append((words[1:], priority))
+
+    def match(self, message):
+        """Return the highest-priority intent found in message, or None."""
+        words = _WORD.findall(message.lower())
+        best = len(self.intents)
+        lookup = self._words.get
+        for index, word in enumerate(words):
+            priority = lookup(word, best)
+            if priority < best:
+                best = priority
+                if best == 0:
+                    break
+            phrases = self._phrases.get(word)
+            if phrases:
+                for rest, priority in phrases:
+                    if priority < best and tuple(words[index + 1:index + 1 + len(rest)]) == rest:
+                        best = priority
+        return self.intents[best] if best < len(self.intents) else None
+
+
+# Manual responder used when HuggingFace is unavailable, in priority order
+MANUAL_INTENTS = [
+    {
+        "name": "greeting",
+        "keywords": ['hello', 'hi', 'hey', 'namaste'],
+        "responses": [
+            "Hello! Welcome to Royal Studio. How can I assist you today? You can ask me questions, generate images, or send SMS messages.",
+            "Hi there! I'm your Royal Studio AI assistant. What would you like to explore today?",
+            "Namaste! Welcome to the royal experience. How may I serve you today?",
+            "Greetings! Ready to create something amazing together?"
+        ]
+    },
+    {
+        "name": "help",
+        "keywords": ['help', 'what can you do', 'features', 'feature'],
+        "responses": [
+            "I can help you with:\n• Chat conversations\n• Image generation\n• SMS messaging\n• Event information\n\nWhat would you like to try?"
+        ]
+    },
+    {
+        "name": "identity",
+        "keywords": ['name', 'who are you', 'what are you'],
+        "responses": [
+            "I'm your Royal Studio AI assistant, created by Arun Shekhar. I'm here to help with chat, images, and SMS!",
+            "I'm the Royal Studio AI - your premium digital companion for creative tasks and conversations.",
+            "I'm an AI assistant built for Royal Studio. I can chat, generate images, and send SMS messages!"
+        ]
+    },
+    {
+        "name": "image",
+        "keywords": ['image', 'images', 'picture', 'pictures', 'generate', 'create', 'draw', 'drawing',
+                     'art', 'artwork'],
+        "responses": [
+            "To generate images, please go to the 'Image Generator' tab above. You can describe what you want to create!",
+            "I can create amazing images for you! Switch to the Image Generator tab and describe your vision.",
+            "Ready to create some art? Head to the Image Generator tab and let your imagination flow!"
+        ]
+    },
+    {
+        "name": "sms",
+        "keywords": ['sms', 'message', 'messages', 'text', 'phone'],
+        "responses": [
+            "To send SMS messages, please go to the 'SMS' tab above. You'll need to configure Twilio credentials first."
+        ]
+    },
+    {
+        "name": "events",
+        "keywords": ['event', 'events', 'hackathon', 'hackathons', 'conference', 'conferences'],
+        "responses": [
+            "I can show you upcoming events and hackathons! Check out the events section for more details."
+        ]
+    },
+    {
+        "name": "thanks",
+        "keywords": ['thank', 'thanks', 'thankyou', 'appreciate', 'appreciated'],
+        "responses": [
+            "You're welcome! I'm here to help. Feel free to ask me anything else.",
+            "My pleasure! Happy to assist you anytime.",
+            "Glad I could help! What else can I do for you?",
+            "You're most welcome! I'm always here for your royal experience."
+        ]
+    },
+    {
+        "name": "goodbye",
+        "keywords": ['bye', 'goodbye', 'exit', 'see you'],
+        "responses": [
+            "Goodbye! Have a wonderful day. Come back anytime for more royal experiences!",
+            "Farewell! It was great chatting with you. See you soon!",
+            "Take care! Thanks for visiting Royal Studio. Until next time!",
+            "Goodbye! May your day be filled with creativity and joy!"
+        ]
+    },
+    {
+        "name": "question",
+        "keywords": ['how', 'why', 'what', 'when', 'where'],
+        "responses": [
+            "That's a great question! I'm here to help with Royal Studio features. Would you like to know about chat, image generation, or SMS?",
+            "Interesting question! I can assist with various tasks. What specific feature would you like to explore?",
+            "I'd love to help answer that! Tell me more about what you're looking for - images, messages, or just a chat?",
+            "Good question! I'm designed to help with creative tasks and conversations. What can I help you with today?"
+        ]
+    },
+    {
+        "name": "creator",
+        "keywords": ['arun', 'developer', 'creator', 'maker'],
+        "responses": [
+            "Arun Shekhar is the brilliant mind behind Royal Studio! He's created this premium AI experience for you.",
+            "Yes, Arun Shekhar is my creator and the co-founder of Royal Studio. He's built something amazing here!",
+            "Arun Shekhar developed this entire Royal Studio platform. Pretty impressive, right?"
+        ]
+    },
+    {
+        "name": "praise",
+        "keywords": ['good', 'nice', 'awesome', 'cool', 'amazing'],
+        "responses": [
+            "Thank you! I'm glad you're enjoying Royal Studio. What would you like to try next?",
+            "That's wonderful to hear! I'm here to make your experience even better.",
+            "I'm so happy you like it! Royal Studio is designed to impress. What shall we do next?",
+            "Fantastic! Your enthusiasm makes my day. How can I help you further?"
+        ]
+    },
+]
+
+# More varied fallback responses when no intent matches
+FALLBACK_RESPONSES = [
+    "That's interesting! I'm your Royal Studio AI assistant. I can help with chat, image generation, or SMS. What would you like to explore?",
+    "I'd love to help you with that! I specialize in conversations, creating images, and sending messages. Which interests you?",
+    "Great question! As your Royal Studio assistant, I can chat, generate amazing images, or help with SMS. What sounds fun?",
+    "I'm here to assist! Whether you want to chat, create art, or send messages - I've got you covered. What's your preference?",
+    "Fascinating! I'm designed to help with various tasks at Royal Studio. Would you like to try image generation, SMS, or just continue chatting?"
+]
+
+# Royal Studio context added around HuggingFace replies, in priority order
+CONTEXT_INTENTS = [
+    {
+        "name": "greeting",
+        "keywords": ['hello', 'hi', 'hey'],
+        "template": "Hello! I'm your Royal Studio AI assistant. {reply}"
+    },
+    {
+        "name": "help",
+        "keywords": ['help', 'what can you do'],
+        "template": "{reply}\n\nI can also help you with image generation and SMS messaging through Royal Studio!"
+    },
+    {
+        "name": "identity",
+        "keywords": ['name', 'who are you'],
+        "template": "I'm your Royal Studio AI assistant created by Arun Shekhar. {reply}"
+    },
+]
+
+manual_intents = IntentMatcher(MANUAL_INTENTS)
+context_intents = IntentMatcher(CONTEXT_INTENTS)
+
+
+def stable_hash(text):
+    """
+    Process-independent hash for picking response variants.
+
+    Unlike hash(), CRC32 does not depend on PYTHONHASHSEED, so every worker and
+    instance gives the same message the same reply.
+    """
+    return zlib.crc32(text.encode('utf-8'))
+
+
+ManualResponse = namedtuple('ManualResponse', ['intent', 'text', 'body', 'etag'])
+
+
+def _build_response_table():
+    # Pre-serialize every possible reply once; responses are served as these bytes
+    table = {}
+    for name, responses in [(intent["name"], intent["responses"]) for intent in MANUAL_INTENTS] + [
+            ("fallback", FALLBACK_RESPONSES)]:
+        entries = []
+        for text in responses:
+            body = json.dumps({"response": text}).encode('utf-8')
+            entries.append(ManualResponse(name, text, body, hashlib.sha1(body).hexdigest()))
+        table[name] = entries
+    return table
+
+
+MANUAL_RESPONSE_TABLE = _build_response_table()
+
+
+@lru_cache(maxsize=4096)
+def select_manual_response(user_message):
+    """Return the ManualResponse for a message; the same message always gets the same reply."""
+    intent = manual_intents.match(user_message)
+    entries = MANUAL_RESPONSE_TABLE[intent["name"] if intent else "fallback"]
+    return entries[stable_hash(user_message) % len(entries)]
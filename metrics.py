@@ -0,0 +1,168 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms are labelled and thread-safe; gauges are read from a
+callback at scrape time so existing stats() methods can be exported without
+double bookkeeping. Values are kept per process: under gunicorn each worker
+serves its own numbers, so scrape every worker (or run one) for exact totals.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; spans cache hits (sub-millisecond) to slow image generations
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# Bytes; 16 KiB to 16 MiB
+SIZE_BUCKETS = tuple(16 * 1024 * 4 ** i for i in range(6))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+    # Appended to the name on the HELP/TYPE lines, which must match the sample names
+    metadata_suffix = ''
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return tuple(str(label) for label in labels)
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        family = self.name + self.metadata_suffix
+        lines = [f'# HELP {family} {self.documentation}', f'# TYPE {family} {self.kind}']
+        for suffix, labels, extra, value in self._samples():
+            lines.append(f'{self.name}{suffix}{_format_labels(self.labelnames, labels, extra)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+    metadata_suffix = '_total'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            return [('_total', labels, (), value) for labels, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._values = {}
+
+    def observe(self, value, *labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        """Observe the wall-clock duration of the with-block, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def _samples(self):
+        with self._lock:
+            snapshot = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._values.items()]
+        samples = []
+        for labels, counts, total, count in sorted(snapshot):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                samples.append(('_bucket', labels, (('le', _format_value(float(bound))),), cumulative))
+            samples.append(('_sum', labels, (), total))
+            samples.append(('_count', labels, (), count))
+        return samples
+
+
+class CallbackGauge(_Metric):
+    """A gauge whose samples come from fn(), which returns {label tuple: value}."""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames, fn):
+        super().__init__(name, documentation, labelnames)
+        self.fn = fn
+
+    def _samples(self):
+        return [('', tuple(str(label) for label in labels), (), value) for labels, value in sorted(self.fn().items())]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, labelnames, fn):
+        return self.register(CallbackGauge(name, documentation, labelnames, fn))
+
+    def render(self):
+        """Return every metric in the Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics)
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
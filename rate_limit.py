@@ -0,0 +1,81 @@
+"""
+Token-bucket rate limiting.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucket:
+    """
+    Classic token bucket: refills at `rate` tokens per second up to `capacity`.
+
+    acquire() blocks until a token is available; try_acquire() never blocks.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available; return seconds to wait otherwise (0 means acquired)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1, timeout=None):
+        """Block until tokens are taken; return False if timeout elapses first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+class KeyedRateLimiter:
+    """
+    One TokenBucket per key (e.g. client address), created on first use.
+
+    At most max_keys buckets are kept; the least recently used is dropped to
+    make room, which only forgives a client that has been quiet the longest.
+    """
+
+    def __init__(self, rate, capacity=None, max_keys=10000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, key, tokens=1):
+        """Like TokenBucket.try_acquire() for key's bucket: 0 if acquired, else seconds to wait."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity)
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+        return bucket.try_acquire(tokens)
+
+    def __len__(self):
+        return len(self._buckets)
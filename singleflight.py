@@ -0,0 +1,109 @@
+"""
+Single-flight request coalescing.
+
+Concurrent callers asking for the same key share one in-flight call instead of
+each hitting the upstream service; every waiter receives the same result (or
+the same exception).
+"""
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls by key and count how much work was saved."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.original = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) once per key at a time.
+
+        Returns a tuple of (result, shared) where shared is True when the result
+        came from a call started by another caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.original += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self, key=None):
+        """The number of calls running, or with key, whether a call for key is running."""
+        with self._lock:
+            return len(self._calls) if key is None else key in self._calls
+
+    def stats(self):
+        with self._lock:
+            return {
+                "original": self.original,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
+
+
+class AsyncSingleFlight:
+    """asyncio counterpart of SingleFlight for coroutines running on one event loop."""
+
+    def __init__(self):
+        self._calls = {}
+        self.original = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        """Await fn(*args, **kwargs) once per key at a time; returns (result, shared)."""
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield() so one cancelled waiter does not cancel the shared call
+            return await asyncio.shield(future), True
+
+        self.original += 1
+        future = asyncio.ensure_future(fn(*args, **kwargs))
+        self._calls[key] = future
+        try:
+            return await asyncio.shield(future), False
+        finally:
+            if future.done():
+                self._calls.pop(key, None)
+            else:
+                future.add_done_callback(lambda _: self._calls.pop(key, None))
+
+    def stats(self):
+        return {
+            "original": self.original,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+        }
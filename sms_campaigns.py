@@ -0,0 +1,256 @@
+"""
+Durable background SMS campaigns.
+
+A campaign's recipients are written to SQLite before anything is sent, and
+background workers drain the pending rows. Each row moves pending -> sending ->
+sent/error, and a worker claims one row at a time, right before its Twilio
+call, so after a crash or redeploy the queue resumes from the rows still
+pending. Rows caught mid-send are marked 'unknown' rather than retried, since
+Twilio may already have accepted them and resending would double-send.
+
+Several worker processes can share one database: claims are made in
+IMMEDIATE transactions, and a row only counts as interrupted once its claim is
+older than the stale-claim timeout.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from sms_dispatch import send_one
+
+PENDING = 'pending'
+SENDING = 'sending'
+SENT = 'sent'
+ERROR = 'error'
+UNKNOWN = 'unknown'
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    id TEXT PRIMARY KEY,
+    message TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS recipients (
+    campaign_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    to_number TEXT NOT NULL,
+    status TEXT NOT NULL,
+    sid TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (campaign_id, position)
+);
+CREATE INDEX IF NOT EXISTS recipients_status ON recipients (status);
+"""
+
+
+class CampaignStore:
+    """SQLite-backed queue of campaign recipients."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+
+    @property
+    def _conn(self):
+        # Opened lazily and per process: SQLite connections must not cross a fork
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def create(self, message, recipients):
+        """
+        Persist a campaign and return its id.
+
+        recipients is a list of (to_number, error) pairs; rows with an error are
+        stored as already failed and never sent.
+        """
+        campaign_id = uuid.uuid4().hex
+        now = time.time()
+        rows = [
+            (campaign_id, position, to_number, ERROR if error else PENDING, error, now)
+            for position, (to_number, error) in enumerate(recipients)
+        ]
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute(
+                    'INSERT INTO campaigns (id, message, total, created_at) VALUES (?, ?, ?, ?)',
+                    (campaign_id, message, len(rows), now)
+                )
+                self._conn.executemany(
+                    'INSERT INTO recipients (campaign_id, position, to_number, status, error, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    rows
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return campaign_id
+
+    def recover(self, stale_after):
+        """Mark rows claimed more than stale_after seconds ago as unknown; return how many."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                'UPDATE recipients SET status = ?, error = ?, updated_at = ? WHERE status = ? AND updated_at < ?',
+                (UNKNOWN, 'Interrupted while sending; delivery unknown', now, SENDING, now - stale_after)
+            )
+            return cursor.rowcount
+
+    def claim(self):
+        """
+        Atomically move the oldest pending row to sending and return it, or None.
+
+        Only claim a row that is about to be sent: if the process dies, every
+        row still sending is marked unknown by recover().
+        """
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute(
+                    'SELECT r.campaign_id, r.position, r.to_number, c.message '
+                    'FROM recipients r JOIN campaigns c ON c.id = r.campaign_id '
+                    'WHERE r.status = ? ORDER BY c.created_at, r.position LIMIT 1',
+                    (PENDING,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        'UPDATE recipients SET status = ?, updated_at = ? WHERE campaign_id = ? AND position = ?',
+                        (SENDING, time.time(), row[0], row[1])
+                    )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return row
+
+    def record(self, campaign_id, position, result):
+        with self._lock:
+            self._conn.execute(
+                'UPDATE recipients SET status = ?, sid = ?, error = ?, updated_at = ? '
+                'WHERE campaign_id = ? AND position = ?',
+                (
+                    SENT if result["status"] == "success" else ERROR,
+                    result.get("sid"),
+                    result.get("error"),
+                    time.time(),
+                    campaign_id,
+                    position
+                )
+            )
+
+    def has_pending(self):
+        with self._lock:
+            row = self._conn.execute('SELECT 1 FROM recipients WHERE status = ? LIMIT 1', (PENDING,)).fetchone()
+        return row is not None
+
+    def progress(self, campaign_id, offset=0, limit=50):
+        """Return counts by status plus one page of recipient rows, or None if unknown."""
+        with self._lock:
+            campaign = self._conn.execute(
+                'SELECT id, total, created_at FROM campaigns WHERE id = ?', (campaign_id,)
+            ).fetchone()
+            if campaign is None:
+                return None
+            counts = dict(self._conn.execute(
+                'SELECT status, COUNT(*) FROM recipients WHERE campaign_id = ? GROUP BY status',
+                (campaign_id,)
+            ).fetchall())
+            rows = self._conn.execute(
+                'SELECT position, to_number, status, sid, error FROM recipients '
+                'WHERE campaign_id = ? ORDER BY position LIMIT ? OFFSET ?',
+                (campaign_id, limit, offset)
+            ).fetchall()
+        counts = {status: counts.get(status, 0) for status in (PENDING, SENDING, SENT, ERROR, UNKNOWN)}
+        return {
+            "campaign_id": campaign[0],
+            "total": campaign[1],
+            "created_at": campaign[2],
+            "counts": counts,
+            "complete": counts[PENDING] == 0 and counts[SENDING] == 0,
+            "offset": offset,
+            "limit": limit,
+            "results": [
+                {"position": position, "to": to_number, "status": status, "sid": sid, "error": error}
+                for position, to_number, status, sid, error in rows
+            ]
+        }
+
+
+class CampaignRunner:
+    """Background workers that drain pending campaign rows through Twilio."""
+
+    def __init__(self, store, get_client, from_number, limiter=None, workers=4, idle_seconds=1.0,
+                 stale_claim_seconds=300):
+        self.store = store
+        self.get_client = get_client
+        self.from_number = from_number
+        self.limiter = limiter
+        self.workers = workers
+        self.idle_seconds = idle_seconds
+        self.stale_claim_seconds = stale_claim_seconds
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the workers once; rows interrupted by a dead process are recovered while idle."""
+        with self._lock:
+            if self._threads:
+                return
+            self._recover()
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'sms-campaign-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _recover(self):
+        recovered = self.store.recover(self.stale_claim_seconds)
+        if recovered:
+            logger.warning("SMS campaigns: %d interrupted recipient(s) marked unknown", recovered)
+
+    def notify(self):
+        """Wake idle workers after new rows were queued."""
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _work(self):
+        while not self._stop.is_set():
+            client = self.get_client()
+            row = None
+            if client is not None and self.store.has_pending():
+                # Wait for the rate limit before claiming, so a row is only 'sending' during its Twilio call
+                if self.limiter is not None:
+                    self.limiter.acquire()
+                if not self._stop.is_set():
+                    row = self.store.claim()
+            if row is None:
+                if client is not None:
+                    self._recover()
+                self._wake.wait(self.idle_seconds)
+                self._wake.clear()
+                continue
+            campaign_id, position, to_number, message = row
+            result = send_one(client, self.from_number, message, to_number)
+            self.store.record(campaign_id, position, result)
@@ -0,0 +1,48 @@
+"""
+Concurrent bulk SMS sending.
+
+Messages go out on a bounded worker pool, paced by a token bucket matched to the
+sender number's messages-per-second limit. Results keep the order of the input.
+"""
+from twilio.base.exceptions import TwilioRestException
+
+
+def normalize_phone(number: str) -> str:
+    # Remove spaces, dashes, parentheses
+    cleaned = ''.join(ch for ch in number.strip() if ch.isdigit() or ch == '+')
+    # Ensure leading '+' and at least country code + number length
+    if not cleaned.startswith('+'):
+        # If the number starts with country code digits (common in copies), reject to avoid wrong sends
+        return ''
+    return cleaned
+
+
+def send_one(twilio_client, from_number, message_text, to_number, limiter=None):
+    """Send a single message and return its result entry."""
+    if limiter is not None:
+        limiter.acquire()
+    try:
+        message = twilio_client.messages.create(
+            body=message_text,
+            from_=from_number,
+            to=to_number
+        )
+        return {"to": to_number, "status": "success", "sid": message.sid}
+    except TwilioRestException as e:
+        return {"to": to_number, "status": "error", "error": str(e)}
+    except Exception as e:
+        return {"to": to_number, "status": "error", "error": str(e)}
+
+
+def send_bulk(twilio_client, from_number, message_text, numbers, executor, limiter=None):
+    """
+    Send message_text to every number in numbers using executor.
+
+    numbers must already be normalized. Returns one result per number, in the
+    same order as numbers.
+    """
+    futures = [
+        executor.submit(send_one, twilio_client, from_number, message_text, number, limiter)
+        for number in numbers
+    ]
+    return [future.result() for future in futures]
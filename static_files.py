@@ -0,0 +1,177 @@
+"""
+Static frontend serving from a manifest built at startup.
+
+The built frontend (frontend/dist) only changes on deploy, so every file is
+read once when the app starts: its type, ETag and cache policy are worked out
+and compressible files get brotli and gzip variants. A request is then a dict
+lookup and a write of ready-made bytes. Encoded variants a build step already
+wrote next to a file (app.js.br, app.js.gz) are used instead of compressing
+again.
+
+Vite puts a content hash in every asset name under assets/, so those are sent
+as immutable for a year; everything else (index.html, favicon.ico, ...) is
+revalidated with its ETag on each use.
+
+brotli is optional: without it only gzip variants are built (plus any .br
+files found on disk).
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Vite's assetFileNames default: assets/[name]-[hash][extname]
+HASHED_ASSET_PATTERN = re.compile(r'^assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+COMPRESSIBLE_TYPES = ('application/javascript', 'application/json', 'application/manifest+json',
+                      'application/xml', 'image/svg+xml', 'image/x-icon', 'image/vnd.microsoft.icon')
+# Below this, headers outweigh the savings
+MIN_COMPRESS_BYTES = 1024
+# Larger files (e.g. videos) stay on disk and are sent with send_file
+MAX_MEMORY_FILE_BYTES = 4 * 1024 * 1024
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class StaticFile:
+    """One file from the manifest, with its response headers worked out."""
+    __slots__ = ('path', 'disk_path', 'mimetype', 'etag', 'modified_at', 'size', 'cache_control', 'body', 'variants')
+
+    def __init__(self, path, disk_path, mimetype, etag, modified_at, size, cache_control, body, variants):
+        self.path = path
+        self.disk_path = disk_path
+        self.mimetype = mimetype
+        self.etag = etag
+        self.modified_at = modified_at
+        self.size = size
+        self.cache_control = cache_control
+        self.body = body
+        self.variants = variants
+
+
+def _compressible(mimetype):
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES
+
+
+def _compress(data, encoding, brotli_quality):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality) if brotli is not None else None
+    # mtime=0 keeps the output identical across restarts
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def accepted_encodings(header):
+    """Content codings the client lists in Accept-Encoding with a non-zero q-value."""
+    accepted = set()
+    for coding in (header or '').split(','):
+        name, _, params = coding.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class StaticManifest:
+    """Every file under root, read and (where worthwhile) compressed up front."""
+
+    def __init__(self, root, brotli_quality=11, max_memory_file_bytes=MAX_MEMORY_FILE_BYTES):
+        self.root = root
+        self.brotli_quality = brotli_quality
+        self.max_memory_file_bytes = max_memory_file_bytes
+        self.files = {}
+        self.build_seconds = 0.0
+        if os.path.isdir(root):
+            started = time.perf_counter()
+            self._scan()
+            self.build_seconds = time.perf_counter() - started
+            logger.info("Static manifest: %d files from %s in %.2fs", len(self.files), root, self.build_seconds)
+        else:
+            logger.warning("Frontend build not found at %s; run `npm run build` to serve the UI", root)
+
+    def _scan(self):
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                disk_path = os.path.join(directory, filename)
+                path = os.path.relpath(disk_path, self.root).replace(os.sep, '/')
+                if any(filename.endswith(suffix) and os.path.isfile(disk_path[:-len(suffix)])
+                       for _, suffix in ENCODINGS):
+                    # A precompressed sibling; picked up with its original
+                    continue
+                self.files[path] = self._load(path, disk_path)
+
+    def _load(self, path, disk_path):
+        stat = os.stat(disk_path)
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if mimetype.startswith('text/') or mimetype == 'application/javascript':
+            mimetype += '; charset=utf-8'
+        cache_control = IMMUTABLE_CACHE_CONTROL if HASHED_ASSET_PATTERN.match(path) else REVALIDATE_CACHE_CONTROL
+
+        if stat.st_size > self.max_memory_file_bytes:
+            etag = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+            return StaticFile(path, disk_path, mimetype, etag, stat.st_mtime, stat.st_size, cache_control, None, {})
+
+        with open(disk_path, 'rb') as f:
+            body = f.read()
+        etag = hashlib.sha1(body).hexdigest()[:20]
+        variants = {}
+        if stat.st_size >= MIN_COMPRESS_BYTES and _compressible(mimetype):
+            for encoding, suffix in ENCODINGS:
+                if os.path.isfile(disk_path + suffix):
+                    with open(disk_path + suffix, 'rb') as f:
+                        encoded = f.read()
+                else:
+                    encoded = _compress(body, encoding, self.brotli_quality)
+                if encoded is not None and len(encoded) < len(body):
+                    variants[encoding] = encoded
+        return StaticFile(path, disk_path, mimetype, etag, stat.st_mtime, len(body), cache_control, body, variants)
+
+    def get(self, path):
+        """The StaticFile for a URL path relative to root, or None."""
+        return self.files.get(path.lstrip('/'))
+
+    @property
+    def index(self):
+        return self.files.get('index.html')
+
+    def select(self, static_file, accept_encoding):
+        """Return (content encoding or None, body) for the best variant the client accepts."""
+        if static_file.variants:
+            accepted = accepted_encodings(accept_encoding)
+            for encoding, _ in ENCODINGS:
+                if encoding in static_file.variants and encoding in accepted:
+                    return encoding, static_file.variants[encoding]
+        return None, static_file.body
+
+    def stats(self):
+        return {
+            "root": self.root,
+            "files": len(self.files),
+            "bytes": sum(f.size for f in self.files.values()),
+            "compressed_bytes": {
+                encoding: sum(len(f.variants[encoding]) for f in self.files.values() if encoding in f.variants)
+                for encoding, _ in ENCODINGS
+            },
+            "brotli_available": brotli is not None,
+            "build_seconds": round(self.build_seconds, 3)
+        }
@@ -0,0 +1,86 @@
+"""
+Leveled, structured, rate-limited logging.
+
+Records are written as one JSON object per line. Extra fields passed with
+logger.info(..., extra={...}) become top-level keys. Each message template
+(logger, level and format string) has its own token bucket, so an error that
+fires on every request logs a burst and then a steady trickle, with a count of
+the suppressed repeats attached to the next record that gets through.
+"""
+import json
+import logging
+import sys
+import threading
+
+from rate_limit import TokenBucket
+
+# Attributes every LogRecord has; anything else came from extra={...}
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Allow `burst` records per message template, refilled at `rate` per second.
+
+    Loggers named in `exempt` (the development server's access log) always pass.
+    """
+
+    def __init__(self, rate=1.0, burst=10, max_templates=1024, exempt=('werkzeug',)):
+        super().__init__()
+        self.exempt = frozenset(exempt)
+        self.rate = rate
+        self.burst = burst
+        self.max_templates = max_templates
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.name in self.exempt:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        with self._lock:
+            state = self._buckets.get(key)
+            if state is None:
+                if len(self._buckets) >= self.max_templates:
+                    self._buckets.clear()
+                state = self._buckets[key] = [TokenBucket(self.rate, self.burst), 0]
+            if state[0].try_acquire() > 0:
+                state[1] += 1
+                return False
+            suppressed, state[1] = state[1], 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+def configure_logging(level='INFO', rate=1.0, burst=10, stream=None):
+    """
+    Send root logger output to stream (stderr by default) as rate-limited JSON.
+
+    Does nothing if the root logger already has handlers, so a server's own
+    logging configuration (e.g. gunicorn --log-config) takes precedence.
+    """
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JSONFormatter())
+    handler.addFilter(RateLimitFilter(rate=rate, burst=burst))
+    root.addHandler(handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
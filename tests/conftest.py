@@ -0,0 +1,74 @@
+"""
+Shared fixtures: the app, imported once against a local stub Pollinations.
+
+The stub serves a fixed image gzip-encoded (as a CDN in front of Pollinations
+may), after an optional delay, and counts the requests it receives.
+"""
+import gzip
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+IMAGE_BYTES = bytes(range(256)) * 200
+
+
+class StubPollinations(BaseHTTPRequestHandler):
+    url = None
+    delay = 0.0
+    requests = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with StubPollinations.lock:
+            StubPollinations.requests += 1
+        threading.Event().wait(StubPollinations.delay)
+        body = gzip.compress(IMAGE_BYTES)
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='session')
+def stub_pollinations():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubPollinations)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    StubPollinations.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield StubPollinations
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope='session')
+def app_module(stub_pollinations):
+    tmp = tempfile.mkdtemp(prefix='royal-studio-tests-')
+    os.environ.update(
+        POLLINATIONS_BASE_URL=stub_pollinations.url,
+        IMAGE_CACHE_DIR=os.path.join(tmp, 'images'),
+        SMS_CAMPAIGN_DB=os.path.join(tmp, 'sms.sqlite3'),
+        # Nothing should reach Twilio; a closed local port makes any attempt fail fast
+        TWILIO_ACCOUNT_SID='ACtest',
+        TWILIO_AUTH_TOKEN='test',
+        TWILIO_PHONE_NUMBER='+15550000000',
+        TWILIO_API_URL='http://127.0.0.1:9',
+        IMAGE_WARM_BUDGET_PER_MINUTE='0',
+        IMAGE_WARM_STATE=os.path.join(tmp, 'popular-images.json'),
+        ADMISSION_IMAGE_CLIENT_RATE='0',
+        ADMISSION_SMS_CLIENT_RATE='0',
+        LOG_LEVEL='WARNING',
+    )
+    import app
+    return app
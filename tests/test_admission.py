@@ -0,0 +1,29 @@
+"""Admission control wiring."""
+
+
+def test_route_classes_name_real_endpoints(app_module):
+    endpoints = {rule.endpoint for rule in app_module.app.url_map.iter_rules()}
+    assert set(app_module.ROUTE_CLASS_BY_ENDPOINT) <= endpoints
+    assert set(app_module.ROUTE_CLASS_BY_ENDPOINT.values()) <= set(app_module.route_classes)
+
+
+def test_job_event_stream_holds_an_image_jobs_slot(app_module):
+    client = app_module.app.test_client()
+    created = client.post('/api/generate-image/jobs', json={"prompt": "admission job"})
+    job = created.get_json()
+    created.close()
+    gates = {name: app_module.route_classes[name].gate for name in ('image', 'image_jobs')}
+
+    response = client.get(job["events_url"], buffered=False)
+    try:
+        assert (gates['image_jobs'].active, gates['image'].active) == (1, 0)
+        assert b'event: done' in response.get_data()
+    finally:
+        response.close()
+    assert gates['image_jobs'].active == 0
+
+
+def test_per_client_limits_are_off_without_a_client_header(app_module):
+    # conftest does not set ADMISSION_CLIENT_HEADER, and only image and sms rates explicitly
+    assert app_module.route_classes['chat'].clients is None
+    assert app_module.route_classes['default'].clients is None
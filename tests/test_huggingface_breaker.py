@@ -0,0 +1,56 @@
+"""Circuit breaker accounting for HuggingFace chat calls."""
+import json
+
+import pytest
+
+
+class FakeResponse:
+    def __init__(self, status_code, body, content_type='application/json'):
+        self.status_code = status_code
+        self.text = body
+        self.headers = {'Content-Type': content_type}
+
+    def json(self):
+        return json.loads(self.text)
+
+    def iter_lines(self):
+        return iter(self.text.encode().splitlines())
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def breaker(app_module):
+    breaker = app_module.huggingface_breaker
+    before = breaker.total_failures, breaker.total_successes
+    yield lambda: (breaker.total_failures - before[0], breaker.total_successes - before[1])
+    breaker.record_success()
+
+
+@pytest.mark.parametrize('status, body, outcome', [
+    (200, '[{"generated_text": "hi there"}]', (0, 1)),
+    (200, '<html>bad gateway</html>', (1, 0)),
+    (503, '{"error": "loading"}', (1, 0)),
+])
+def test_query_records_one_outcome(app_module, monkeypatch, breaker, status, body, outcome):
+    monkeypatch.setattr(app_module.huggingface_client, 'post', lambda *args, **kwargs: FakeResponse(status, body))
+    try:
+        app_module.query_huggingface("hello")
+    except ValueError:
+        pass
+    assert breaker() == outcome
+
+
+@pytest.mark.parametrize('body, outcome', [
+    ('data: {"token": {"text": "hi"}}\ndata: {"token": {"text": " there"}}', (0, 1)),
+    ('data: {"token": {"text": "hi"}}\ndata: {truncated', (1, 0)),
+])
+def test_stream_records_one_outcome(app_module, monkeypatch, breaker, body, outcome):
+    monkeypatch.setattr(app_module.huggingface_client, 'post',
+                        lambda *args, **kwargs: FakeResponse(200, body, 'text/event-stream'))
+    try:
+        list(app_module.stream_huggingface("hello"))
+    except ValueError:
+        pass
+    assert breaker() == outcome
@@ -0,0 +1,19 @@
+"""Campaign mode of /api/send-sms-bulk."""
+import pytest
+
+
+@pytest.mark.parametrize('entry, stored', [(None, ''), ({"number": "+15550001111"}, "{'number': '+15550001111'}")])
+def test_invalid_recipient_entries_are_stored_as_failed_rows(app_module, entry, stored):
+    client = app_module.app.test_client()
+    response = client.post('/api/send-sms-bulk', json={"to": [entry], "message": "hello", "mode": "campaign"})
+    assert response.status_code == 202
+    campaign_id = response.get_json()["campaign_id"]
+    response.close()
+
+    response = client.get(f'/api/sms-campaigns/{campaign_id}')
+    progress = response.get_json()
+    response.close()
+    assert progress["counts"]["error"] == 1
+    assert progress["complete"]
+    assert progress["results"][0]["to"] == stored
+    assert progress["results"][0]["status"] == "error"
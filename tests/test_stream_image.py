@@ -0,0 +1,41 @@
+"""Streamed image misses (/api/generate-image with "stream": true)."""
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import IMAGE_BYTES
+
+
+def _generate(app_module, prompt):
+    response = app_module.app.test_client().post('/api/generate-image', json={"prompt": prompt, "stream": True})
+    try:
+        return response.status_code, response.headers, response.get_data()
+    finally:
+        response.close()
+
+
+def test_gzip_upstream_is_streamed_decoded_and_cached(app_module):
+    status, headers, body = _generate(app_module, "gzip upstream")
+
+    assert status == 200
+    assert headers['X-Cache'] == 'MISS'
+    # The encoded upstream length does not describe the decoded body
+    assert 'Content-Length' not in headers
+    assert body == IMAGE_BYTES
+    assert ('Accept' in headers.get('Vary', '')) == app_module.TRANSCODING_AVAILABLE
+
+    key = app_module.image_cache_key(app_module.image_params_from_payload({"prompt": "gzip upstream"}))
+    assert app_module.image_cache.get(key) == IMAGE_BYTES
+    assert app_module.route_classes['image'].gate.active == 0
+
+
+def test_concurrent_identical_streams_share_one_fetch(app_module, stub_pollinations):
+    stub_pollinations.delay = 0.3
+    before = stub_pollinations.requests
+    try:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda _: _generate(app_module, "shared stream"), range(4)))
+    finally:
+        stub_pollinations.delay = 0.0
+
+    assert stub_pollinations.requests - before == 1
+    assert [status for status, _, _ in results] == [200] * 4
+    assert all(body == IMAGE_BYTES for _, _, body in results)
@@ -0,0 +1,27 @@
+"""Upstream HTTP clients."""
+import asyncio
+import time
+
+from conftest import IMAGE_BYTES
+from upstream import AsyncUpstreamClient
+
+
+def test_async_client_caps_requests_in_flight(stub_pollinations):
+    async def fetch_all():
+        client = AsyncUpstreamClient('stub', max_concurrency=2, retries=0)
+        try:
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(client.get(stub_pollinations.url + f'/{i}') for i in range(4)))
+            return time.perf_counter() - start, responses
+        finally:
+            await client.close()
+
+    stub_pollinations.delay = 0.2
+    try:
+        elapsed, responses = asyncio.run(fetch_all())
+    finally:
+        stub_pollinations.delay = 0.0
+
+    assert [response.content for response in responses] == [IMAGE_BYTES] * 4
+    # Two rounds of two: without the cap all four would finish after one delay
+    assert elapsed >= 0.4
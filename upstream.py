@@ -0,0 +1,256 @@
+"""
+Shared HTTP clients for upstream APIs (HuggingFace, Pollinations).
+
+Each upstream host gets one pooled requests.Session so connections are kept
+alive and reused across requests instead of paying a TCP+TLS handshake per
+call. Requests that come back with 429/503, or fail to connect, are retried
+with exponential backoff and full jitter. Every attempt can be timed into a
+metrics histogram labelled by upstream name and status code.
+
+AsyncUpstreamClient applies the same policy on top of aiohttp for the ASGI
+serving mode; aiohttp is optional and is imported only when that client is
+created, which keeps it out of the WSGI cold start.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class _RetryPolicy:
+    def __init__(self, name, pool_size=10, connect_timeout=5, read_timeout=30,
+                 retries=2, backoff=0.5, max_backoff=8, retry_statuses=(429, 503), latency=None):
+        self.name = name
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = frozenset(retry_statuses)
+        self.requests_sent = 0
+        self.retries_done = 0
+        # Optional metrics.Histogram labelled (upstream, status)
+        self.latency = latency
+
+    def _observe(self, start, status):
+        if self.latency is not None:
+            self.latency.observe(time.perf_counter() - start, self.name, status)
+
+    def _delay(self, attempt, response=None):
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        # Full jitter: uniform over [0, backoff * 2^attempt]
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def stats(self):
+        return {
+            "requests": self.requests_sent,
+            "retries": self.retries_done,
+            "pool_size": self.pool_size,
+            "timeout": list(self.timeout),
+        }
+
+
+class UpstreamClient(_RetryPolicy):
+    """
+    A keep-alive connection pool plus retry policy for a single upstream host.
+
+    max_concurrency caps the requests in flight to the host across all threads
+    (until the body is read, or the headers for stream=True); callers over the
+    cap wait for a slot. Retry back-off sleeps do not hold a slot.
+    """
+
+    def __init__(self, name, max_concurrency=None, **kwargs):
+        super().__init__(name, **kwargs)
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    # Retries are handled in request() so jitter and Retry-After apply uniformly
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    def _send(self, method, url, **kwargs):
+        if self._slots is None:
+            return self.session.request(method, url, **kwargs)
+        with self._slots:
+            return self.session.request(method, url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request through the pooled session, retrying transient failures.
+
+        Returns the last response even if its status is still retryable, so
+        callers keep handling status codes the way they would with requests.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+        while True:
+            self.requests_sent += 1
+            start = time.perf_counter()
+            try:
+                response = self._send(method, url, **kwargs)
+            except requests.exceptions.ConnectionError:
+                self._observe(start, 'error')
+                if attempt >= self.retries:
+                    raise
+                time.sleep(self._delay(attempt))
+            except Exception:
+                self._observe(start, 'error')
+                raise
+            else:
+                self._observe(start, response.status_code)
+                if response.status_code not in self.retry_statuses or attempt >= self.retries:
+                    return response
+                delay = self._delay(attempt, response)
+                response.close()
+                time.sleep(delay)
+            attempt += 1
+            self.retries_done += 1
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def stats(self):
+        return {**super().stats(), "max_concurrency": self.max_concurrency}
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+class UpstreamStatusError(Exception):
+    """Raised by BufferedResponse.raise_for_status for 4xx/5xx responses."""
+
+    def __init__(self, status_code, url):
+        super().__init__(f"{status_code} error from upstream for url: {url}")
+        self.status_code = status_code
+
+
+class BufferedResponse:
+    """
+    A fully read aiohttp response.
+
+    Exposes the subset of the requests.Response interface the app relies on
+    (status_code, headers, content, text, json(), raise_for_status()), so
+    response handling code can be shared between the sync and async paths.
+    """
+
+    def __init__(self, status_code, headers, content, url, encoding=None):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+        self.encoding = encoding or 'utf-8'
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise UpstreamStatusError(self.status_code, self.url)
+
+
+class AsyncUpstreamClient(_RetryPolicy):
+    """
+    aiohttp counterpart of UpstreamClient, for use inside one event loop.
+
+    max_concurrency caps the requests in flight to the host across all tasks,
+    as in UpstreamClient.
+    """
+
+    def __init__(self, name, max_concurrency=None, **kwargs):
+        try:
+            import aiohttp
+        except ImportError:
+            raise RuntimeError("aiohttp is required for the async serving mode (pip install aiohttp)")
+        super().__init__(name, **kwargs)
+        self._aiohttp = aiohttp
+        self.max_concurrency = max_concurrency
+        self._slots = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            connect_timeout, read_timeout = self.timeout
+            aiohttp = self._aiohttp
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=30),
+                timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+            )
+        return self._session
+
+    async def _send(self, method, url, **kwargs):
+        if self._slots is None:
+            return await self._read(method, url, **kwargs)
+        async with self._slots:
+            return await self._read(method, url, **kwargs)
+
+    async def _read(self, method, url, **kwargs):
+        async with self.session.request(method, url, **kwargs) as response:
+            content = await response.read()
+            return BufferedResponse(response.status, response.headers, content, url, response.charset)
+
+    async def request(self, method, url, **kwargs):
+        """Async version of UpstreamClient.request with the same retry policy."""
+        attempt = 0
+        while True:
+            self.requests_sent += 1
+            start = time.perf_counter()
+            try:
+                response = await self._send(method, url, **kwargs)
+            except self._aiohttp.ClientConnectionError:
+                self._observe(start, 'error')
+                if attempt >= self.retries:
+                    raise
+                await asyncio.sleep(self._delay(attempt))
+            except Exception:
+                self._observe(start, 'error')
+                raise
+            else:
+                self._observe(start, response.status_code)
+                if response.status_code not in self.retry_statuses or attempt >= self.retries:
+                    return response
+                await asyncio.sleep(self._delay(attempt, response))
+            attempt += 1
+            self.retries_done += 1
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+    def stats(self):
+        return {**super().stats(), "max_concurrency": self.max_concurrency}
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None